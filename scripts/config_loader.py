@@ -1,4 +1,7 @@
+import functools
 import json
+import os
+import tempfile
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, Optional
@@ -19,6 +22,14 @@ def load_config(path: Optional[Path] = None) -> Dict[str, Any]:
     - fallback_to_schema
     """
     cfg_path = path or CONFIG_PATH
+    # Copy so callers can't mutate the cached parse
+    return dict(_load_config_cached(str(cfg_path.resolve())))
+
+
+@functools.lru_cache(maxsize=8)
+def _load_config_cached(path_str: str) -> Dict[str, Any]:
+    """Read and parse a config file once per resolved path."""
+    cfg_path = Path(path_str)
     if not cfg_path.exists():
         raise FileNotFoundError(f"Config file not found at {cfg_path}")
 
@@ -35,8 +46,26 @@ def get_swagger_url(path: Optional[Path] = None) -> str:
     return url
 
 
+def write_atomic(target: Path, data: bytes) -> None:
+    """Replace target with data so a concurrent reader never sees a partial file.
+
+    The bytes go to a temporary file in the same directory, which is then renamed
+    over target. The parent directory must exist. OSError propagates after the
+    temporary file is removed, so callers decide whether a failed write matters.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, target)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
 # Centralized, typed configuration for the app
-@dataclass
+@dataclass(frozen=True, slots=True)
 class AppConfig:
     swagger_url: str
     llm_provider: str = "none"
@@ -49,7 +78,14 @@ class AppConfig:
 
 def load_app_config(path: Optional[Path] = None) -> AppConfig:
     """Load configuration and return a typed AppConfig instance with safe defaults."""
-    raw = load_config(path)
+    cfg_path = path or CONFIG_PATH
+    return _load_app_config_cached(str(cfg_path.resolve()))
+
+
+@functools.lru_cache(maxsize=8)
+def _load_app_config_cached(path_str: str) -> AppConfig:
+    """Build the (immutable) AppConfig once per resolved path."""
+    raw = _load_config_cached(path_str)
     if not raw.get("swagger_url"):
         raise KeyError("'swagger_url' not set in config.json")
 
@@ -2,10 +2,13 @@
 # Script: Debug the results of the automated regression suite using Playwright
 
 import subprocess
+import hashlib
 import json
 import os
 import re
 import sys
+import tempfile
+from collections import Counter, deque
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Set, Tuple
@@ -15,7 +18,28 @@ project_root = Path(__file__).parent.parent
 if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
-from scripts.config_loader import load_config
+from scripts.config_loader import load_config, write_atomic
+
+# Optional streaming JSON parser for large Playwright reports
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Optional fast JSON parser/serializer for the Playwright and debug reports
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch either the same way
+json_loads = orjson.loads if orjson is not None else json.loads
+
+# Optional Aho-Corasick automaton for single-pass keyword classification
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 
 # Uses Playwright test runner directly
 
@@ -26,24 +50,31 @@ LLM_PROVIDER = config.get("llm_provider", "openai")
 OPENAI_API_KEY = config.get("openai_api_key")
 ANTHROPIC_API_KEY = config.get("anthropic_api_key")
 MODEL = config.get("model", "gpt-4o")
-
-client = None
-if LLM_PROVIDER == "openai" and OPENAI_API_KEY:
-    try:
-        from openai import OpenAI
-        client = OpenAI(api_key=OPENAI_API_KEY)
-    except Exception:
-        client = None
-elif LLM_PROVIDER == "anthropic" and ANTHROPIC_API_KEY:
-    try:
-        from anthropic import Anthropic
-        client = Anthropic(api_key=ANTHROPIC_API_KEY)
-    except Exception:
-        client = None
+# The provider SDK is imported only when an analysis actually runs (see TestDebugger.get_llm_client)
 
 TEST_FILE = sys.argv[1] if len(sys.argv) > 1 else str(project_root / "tests" / "spec.ts")
 PROJECT = sys.argv[2] if len(sys.argv) > 2 else "chromium"
 
+# Resolve the test target and reports directory once at startup
+TEST_FILE_PATH = Path(TEST_FILE) if os.path.isabs(TEST_FILE) else project_root / TEST_FILE
+if not TEST_FILE_PATH.exists():
+    # If the path doesn't exist, default to the tests/ folder
+    TEST_FILE_PATH = project_root / "tests"
+# Created on first write (run_tests_direct / generate_report), not at import
+REPORTS_DIR = project_root / "reports"
+
+# Reporter output larger than this is streamed with ijson (when installed)
+STREAM_THRESHOLD_BYTES = 1024 * 1024
+
+# Stack traces kept per failure are cut to this many characters
+MAX_ERROR_DETAILS_CHARS = 4096
+# Failures beyond this many are only counted, which bounds memory and report size
+MAX_RETAINED_FAILURES = 500
+
+# Custom reporter that prints one JSON line per finished test
+STREAM_REPORTER = Path(__file__).parent / "stream_reporter.js"
+TEST_EVENT_PREFIX = "@@pw-test-end "
+
 
 # Utilities
 ANSI_ESCAPE_RE = re.compile(r"\x1B\[[0-?]*[ -/]*[@-~]")
@@ -56,6 +87,7 @@ def strip_ansi(text: str) -> str:
 def extract_expected_received(text: str) -> Tuple[str, str] | Tuple[None, None]:
     if not text:
         return (None, None)
+
     clean = strip_ansi(text)
     # Common Playwright expect() format with newlines
     m = re.search(r"Expected:\s*([^\r\n]+)[\r\n]+\s*Received:\s*([^\r\n]+)", clean, re.IGNORECASE)
@@ -68,7 +100,192 @@ def extract_expected_received(text: str) -> Tuple[str, str] | Tuple[None, None]:
     return (None, None)
 
 
+# Suggestion actions and classifier patterns, built once at import.
+# Matching is case-insensitive so messages are never lowercased.
+NETWORK_ACTIONS = (
+    "Check if the API server is running and accessible",
+    "Verify the BASE_URL in your test file is correct",
+    "Check network connectivity and firewall settings",
+    "Increase timeout values in playwright.config.ts if the API is slow"
+)
+ENDPOINT_ACTIONS = (
+    "Verify the endpoint path matches the API documentation",
+    "Check if path parameters are correctly replaced with actual IDs",
+    "Ensure POST tests run before GET/DELETE operations (use test.describe.serial)",
+    "Verify resourceIds are being stored correctly after POST requests",
+    "Check if the resource was actually created before trying to access it"
+)
+AUTH_ACTIONS = (
+    "Verify API_KEY is correctly set in the test file",
+    "Check if the API requires authentication headers",
+    "Ensure the API key has proper permissions",
+    "Review authentication requirements in API documentation"
+)
+REQUEST_ACTIONS = (
+    "Review the request payload structure",
+    "Check if all required fields are included",
+    "Verify data types match the API schema",
+    "Ensure JSON format is valid"
+)
+SERVER_ACTIONS = (
+    "This may be a server-side issue, not a test problem",
+    "Check API server logs",
+    "Verify the API is functioning correctly",
+    "Try the request manually to confirm"
+)
+ASSERTION_ACTIONS = (
+    "Review the expected vs actual values in the error message",
+    "Check if the API response format changed",
+    "Verify the test expectations match API behavior",
+    "Consider if the test data is valid for the API",
+    "Check if status code expectations are correct (200 vs 201 vs 204)"
+)
+DEPENDENCY_ACTIONS = (
+    "Ensure POST tests run before GET/DELETE tests",
+    "Use test.describe.serial() for sequential execution",
+    "Check if resourceIds are being stored correctly after POST",
+    "Verify test execution order matches resource dependencies",
+    "Review the test generation to ensure proper ordering"
+)
+STATUS_ACTIONS = (
+    "Verify the expected status code matches API documentation",
+    "Check if the operation actually succeeded (201 for POST, 200 for GET)",
+    "Review API response to understand why status differs",
+    "Consider if the endpoint behavior changed"
+)
+
+# Prebuilt suggestions, in the order they are reported
+SUGGESTIONS = {
+    "network": {"type": "network", "severity": "high",
+                "message": "Network or connection issue detected", "actions": NETWORK_ACTIONS},
+    "endpoint": {"type": "endpoint", "severity": "high",
+                 "message": "Endpoint not found (404) - Resource may not exist", "actions": ENDPOINT_ACTIONS},
+    "authentication": {"type": "authentication", "severity": "high",
+                       "message": "Authentication or authorization issue", "actions": AUTH_ACTIONS},
+    "request": {"type": "request", "severity": "medium",
+                "message": "Bad request - invalid request data", "actions": REQUEST_ACTIONS},
+    "server": {"type": "server", "severity": "medium",
+               "message": "Server error - API issue", "actions": SERVER_ACTIONS},
+    "assertion": {"type": "assertion", "severity": "medium",
+                  "message": "Test assertion failed - Expected vs Actual mismatch", "actions": ASSERTION_ACTIONS},
+    "dependency": {"type": "dependency", "severity": "low",
+                   "message": "Missing resource dependency - Test skipped", "actions": DEPENDENCY_ACTIONS},
+}
+
+# Keywords that classify an error message, with the suggestion each one triggers
+CATEGORY_KEYWORDS = (
+    ("net::err", "network"),
+    ("network", "network"),
+    ("timeout", "network"),
+    ("404", "endpoint"),
+    ("401", "authentication"),
+    ("403", "authentication"),
+    ("unauthorized", "authentication"),
+    ("400", "request"),
+    ("bad request", "request"),
+    ("500", "server"),
+    ("internal server error", "server"),
+    ("expect", "assertion"),
+    ("assertion", "assertion"),
+    ("tobe", "assertion"),
+    ("skipping", "dependency"),
+)
+
+# One scan of the error message classifies it into every matching category.
+# With pyahocorasick installed this is a true automaton pass over the lowercased
+# message; otherwise the regex below does the same job.
+if ahocorasick is not None:
+    KEYWORD_AUTOMATON = ahocorasick.Automaton()
+    for keyword, category in CATEGORY_KEYWORDS:
+        KEYWORD_AUTOMATON.add_word(keyword, category)
+    KEYWORD_AUTOMATON.make_automaton()
+else:
+    KEYWORD_AUTOMATON = None
+
+# The alternation sits inside a lookahead so each position is tested without
+# consuming text, which keeps overlapping keywords (e.g. "404" in "40401") visible.
+DISPATCH_RE = re.compile(
+    "(?=" + "|".join(
+        f"(?P<{category}>" + "|".join(re.escape(keyword) for keyword, c in CATEGORY_KEYWORDS if c == category) + ")"
+        for category in dict.fromkeys(category for _, category in CATEGORY_KEYWORDS)
+    ) + ")",
+    re.IGNORECASE
+)
+# Checks that don't fit the single-keyword scan
+NOT_FOUND_RE = re.compile(r"not found", re.IGNORECASE)
+MISSING_DEPENDENCY_RE = re.compile(r"\A(?=.*no)(?=.*available)", re.IGNORECASE | re.DOTALL)
+
+# Status code mismatch: an Expected/Received pair plus the HTTP codes involved
+EXPECTED_RECEIVED_RE = re.compile(r"\A(?=.*expected)(?=.*received)", re.IGNORECASE | re.DOTALL)
+STATUS_CODE_RE = re.compile(r"\b(200|201|204|400|401|403|404|500)\b")
+
+
+# Text report templates, parsed once at import and bound to str.format/format_map
+RULE = "=" * 80
+REPORT_HEADER_TPL = f"""
+{RULE}
+🐛 TEST DEBUG REPORT
+{RULE}
+
+Summary:
+  Total Tests: {{total}}
+  Passed: {{passed}} ({{passRate}}%)
+  Failed: {{failed}}
+  Skipped: {{skipped}}
+
+""".format_map
+FAILED_TESTS_HEADER = f"""
+{RULE}
+FAILED TESTS ANALYSIS
+{RULE}
+"""
+FAILURE_TPL = """
+❌ {test}
+   File: {file}:{line}
+   Status: {status}
+   Duration: {duration}ms
+   Retry: {retry}
+
+    Error: {error}
+""".format
+EXPECTED_RECEIVED_TPL = """
+   Expected: {expected}
+   Received: {received}
+""".format
+SUGGESTIONS_HEADER = """
+    🔍 Debugging Suggestions:
+"""
+SUGGESTION_TPL = "   [{}] {}\n".format
+EXECUTION_ERRORS_HEADER = f"""
+{RULE}
+EXECUTION ERRORS
+{RULE}
+"""
+ERROR_TPL = """
+❌ {}
+
+   Suggestions:
+""".format
+ALL_PASSED_BANNER = f"""
+{RULE}
+✅ ALL TESTS PASSED!
+{RULE}
+"""
+AI_SECTION_TPL = f"""
+{RULE}
+RECOMMENDATIONS
+{RULE}
+    {{}}
+    """.format
+REPORT_FOOTER = f"\n{RULE}\n"
+
+
 class TestDebugger:
+    __slots__ = (
+        "results", "reports_dir", "json_report_file", "txt_report_file",
+        "llm_cache_dir", "llm_client"
+    )
+
     def __init__(self):
         self.results = {
             "total": 0,
@@ -76,10 +293,19 @@ class TestDebugger:
             "failed": 0,
             "skipped": 0,
             "failures": [],
+            "failures_truncated": 0,
+            # Suggestion types of the failures past the cap, so the recommendations still count them
+            "truncated_categories": Counter(),
             "errors": [],
             "warnings": []
         }
 
+        self.reports_dir = REPORTS_DIR
+        self.json_report_file = self.reports_dir / "debug_report.json"
+        self.txt_report_file = self.reports_dir / "debug_report.txt"
+        self.llm_cache_dir = self.reports_dir / ".llm_cache"
+        self.llm_client = None
+
     def run_tests(self):
         """Run Playwright tests and collect results"""
         print("=" * 80)
@@ -102,34 +328,58 @@ class TestDebugger:
         """Run tests directly with Playwright JSON reporter"""
         print("▶️  Running Playwright tests directly...\n")
         try:
-            # Ensure TEST_FILE is absolute or relative to project root
-            test_file_path = TEST_FILE if os.path.isabs(TEST_FILE) else str(project_root / TEST_FILE)
-            # If the path doesn't exist, default to the tests/ folder
-            if not os.path.exists(test_file_path):
-                test_file_path = str(project_root / "tests")
-            cmd = ["npx", "playwright", "test", test_file_path, "--reporter=json"]
+            cmd = ["npx", "playwright", "test", str(TEST_FILE_PATH), f"--reporter=json,{STREAM_REPORTER}"]
             # Only add project flag if explicitly provided
             if PROJECT:
                 cmd.append(f"--project={PROJECT}")
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                cwd=str(project_root)
-            )
-
-            try:
-                json_output = json.loads(result.stdout)
-                # If no suites/specs found, treat as discovery failure
-                if not json_output.get("suites") and not json_output.get("specs"):
-                    return self.analyze_error_output("No tests discovered. Check file path or Playwright configuration.", None)
-                return self.analyze_results(json_output)
-            except json.JSONDecodeError:
-                # Fallback: analyze raw text output
-                output_text = (result.stdout or "") + (result.stderr or "")
-                if not output_text.strip():
-                    return self.analyze_error_output("No output from Playwright. Ensure Playwright is installed and tests exist.", None)
-                return self.analyze_text_output(output_text)
+            # The JSON reporter writes straight to disk instead of through a stdout pipe
+            self.reports_dir.mkdir(exist_ok=True)
+            raw_report = self.reports_dir / "raw.json"
+            if raw_report.exists():
+                raw_report.unlink()
+            env = os.environ.copy()
+            env["PLAYWRIGHT_JSON_OUTPUT_NAME"] = str(raw_report)
+
+            with tempfile.TemporaryFile("w+", encoding="utf-8", errors="replace") as console_file:
+                proc = subprocess.Popen(
+                    cmd,
+                    stdout=subprocess.PIPE,
+                    stderr=console_file,
+                    cwd=str(project_root),
+                    env=env,
+                    text=True,
+                    encoding="utf-8",
+                    errors="replace",
+                    bufsize=1
+                )
+                with proc:
+                    # Failures are analyzed as each test finishes, while later tests are still running
+                    streamed = self.analyze_test_events(proc.stdout, console_file.write)
+                if streamed is not None:
+                    return streamed
+
+                # The streaming reporter produced nothing: use the json reporter's file instead
+                if raw_report.exists():
+                    # Large reports are streamed suite by suite; small ones are parsed in one go
+                    if ijson is not None and raw_report.stat().st_size >= STREAM_THRESHOLD_BYTES:
+                        with open(raw_report, "rb") as f:
+                            return self.analyze_streamed_suites(ijson.items(f, "suites.item", use_float=True))
+                    try:
+                        json_output = json_loads(raw_report.read_bytes())
+                        # If no suites/specs found, treat as discovery failure
+                        if not json_output.get("suites") and not json_output.get("specs"):
+                            return self.analyze_error_output("No tests discovered. Check file path or Playwright configuration.", None)
+                        return self.analyze_results(json_output)
+                    except json.JSONDecodeError:
+                        pass
+
+                console_file.seek(0)
+                output_text = console_file.read()
+
+            # Fallback: analyze raw text output
+            if not output_text.strip():
+                return self.analyze_error_output("No output from Playwright. Ensure Playwright is installed and tests exist.", None)
+            return self.analyze_text_output(output_text)
         except Exception as e:
             return self.analyze_error_output(str(e), e)
 
@@ -137,42 +387,126 @@ class TestDebugger:
         """Analyze JSON test results and produce a friendly report"""
         print("📊 Analyzing test results...\n")
 
-        if "suites" in json_results:
-            for suite in json_results["suites"]:
-                self.process_suite(suite)
-        elif "specs" in json_results:
-            for spec in json_results["specs"]:
-                self.process_spec(spec)
+        self._walk(json_results)
+        self.attach_suggestions(self.results["failures"])
 
         # Optionally use LLM to summarize and suggest fixes
         self.apply_llm_analysis()
         self.generate_report()
         return self.results
 
-    def process_suite(self, suite):
-        """Process a test suite"""
-        if "specs" in suite:
-            for spec in suite["specs"]:
-                self.process_spec(spec)
-        if "suites" in suite:
-            for sub_suite in suite["suites"]:
-                self.process_suite(sub_suite)
-
-    def process_spec(self, spec):
-        """Process a test spec"""
-        if "tests" in spec:
-            for test in spec["tests"]:
-                self.results["total"] += 1
-                
-                if "results" in test:
-                    for result in test["results"]:
-                        if result.get("status") == "passed":
-                            self.results["passed"] += 1
-                        elif result.get("status") == "failed":
-                            self.results["failed"] += 1
-                            self.analyze_failure(spec, test, result)
-                        elif result.get("status") == "skipped":
-                            self.results["skipped"] += 1
+    def analyze_test_events(self, lines, passthrough):
+        """Analyze per-test events from the streaming reporter as they arrive.
+
+        Lines that are not reporter events are handed to passthrough. Returns None
+        when no test events were seen, so the caller can fall back to other output.
+        """
+        results = self.results
+        failures = results["failures"]
+        seen_tests = set()
+        suggestion_groups = {}
+        prefix_len = len(TEST_EVENT_PREFIX)
+
+        for line in lines:
+            if not line.startswith(TEST_EVENT_PREFIX):
+                passthrough(line)
+                continue
+            try:
+                event = json_loads(line[prefix_len:])
+            except json.JSONDecodeError:
+                passthrough(line)
+                continue
+
+            if not seen_tests:
+                print("📊 Analyzing test results as they complete...\n")
+            # Retries report the same test again; count it once
+            test_id = event.get("testId")
+            if test_id not in seen_tests:
+                seen_tests.add(test_id)
+                results["total"] += 1
+
+            result = event.get("result", {})
+            status = result.get("status")
+            if status == "passed":
+                results["passed"] += 1
+            elif status == "failed":
+                results["failed"] += 1
+                failure = self.analyze_failure(event.get("spec", {}), {}, result)
+                if len(failures) >= MAX_RETAINED_FAILURES:
+                    results["failures_truncated"] += 1
+                    self.count_truncated(failure, suggestion_groups)
+                    continue
+                self.attach_suggestions((failure,), suggestion_groups)
+                failures.append(failure)
+            elif status == "skipped":
+                results["skipped"] += 1
+
+        if not seen_tests:
+            return None
+
+        self.apply_llm_analysis()
+        self.generate_report()
+        return self.results
+
+    def analyze_streamed_suites(self, suites):
+        """Analyze top-level suites as they are parsed from the JSON reporter stream"""
+        print("📊 Analyzing test results (streaming)...\n")
+
+        discovered = False
+        for suite in suites:
+            discovered = True
+            self._walk(suite)
+
+        # If no suites found, treat as discovery failure
+        if not discovered:
+            return self.analyze_error_output("No tests discovered. Check file path or Playwright configuration.", None)
+
+        self.attach_suggestions(self.results["failures"])
+        self.apply_llm_analysis()
+        self.generate_report()
+        return self.results
+
+    def _walk(self, root):
+        """Walk nested suites/specs iteratively and tally test results"""
+        results = self.results
+        total = results["total"]
+        passed = results["passed"]
+        failed = results["failed"]
+        skipped = results["skipped"]
+        failures = results["failures"]
+        append = failures.append
+        truncated = results["failures_truncated"]
+        analyze_failure = self.analyze_failure
+        count_truncated = self.count_truncated
+        truncated_groups = {}
+
+        # Depth-first, preserving the order Playwright reports suites and specs in
+        stack = deque([root])
+        while stack:
+            node = stack.pop()
+            for spec in node.get("specs", ()):
+                for test in spec.get("tests", ()):
+                    total += 1
+                    for result in test.get("results", ()):
+                        status = result.get("status")
+                        if status == "passed":
+                            passed += 1
+                        elif status == "failed":
+                            failed += 1
+                            if len(failures) < MAX_RETAINED_FAILURES:
+                                append(analyze_failure(spec, test, result))
+                            else:
+                                truncated += 1
+                                count_truncated(analyze_failure(spec, test, result), truncated_groups)
+                        elif status == "skipped":
+                            skipped += 1
+            stack.extend(reversed(node.get("suites", ())))
+
+        results["total"] = total
+        results["passed"] = passed
+        results["failed"] = failed
+        results["skipped"] = skipped
+        results["failures_truncated"] = truncated
 
     def analyze_failure(self, spec, test, result):
         """Analyze a test failure"""
@@ -181,7 +515,6 @@ class TestDebugger:
             "file": spec.get("file") or test.get("file") or "Unknown file",
             "line": spec.get("line") or test.get("line") or 0,
             "status": result.get("status"),
-            "error": None,
             "errorMessage": "",
             "errorDetails": "",
             "expected": None,
@@ -192,13 +525,13 @@ class TestDebugger:
         }
 
         if "error" in result:
+            # Keep only the message and a bounded stack, not the raw error object
             error = result["error"]
-            failure["error"] = error
             raw_message = error.get("message", "")
             raw_details = error.get("stack") or raw_message
             # Sanitize ANSI codes for readability
             failure["errorMessage"] = strip_ansi(raw_message)
-            failure["errorDetails"] = strip_ansi(raw_details)
+            failure["errorDetails"] = strip_ansi(raw_details)[:MAX_ERROR_DETAILS_CHARS]
             # Extract Expected/Received if present
             exp, rec = extract_expected_received(raw_message or raw_details)
             failure["expected"], failure["received"] = exp, rec
@@ -211,132 +544,56 @@ class TestDebugger:
                 failure["file"] = result["errorLocation"].get("file", failure["file"])
                 failure["line"] = result["errorLocation"].get("line", failure["line"])
 
-        # Generate MCP-style suggestions
-        failure["suggestions"] = self.generate_mcp_suggestions(failure)
-        self.results["failures"].append(failure)
+        # Suggestions are attached in one batch once all failures are collected
+        return failure
+
+    def count_truncated(self, failure, groups=None):
+        """Add the suggestion types of a failure past MAX_RETAINED_FAILURES to the report's counts"""
+        self.attach_suggestions((failure,), groups)
+        self.results["truncated_categories"].update({suggestion["type"] for suggestion in failure["suggestions"]})
+
+    def attach_suggestions(self, failures, groups=None):
+        """Generate MCP-style suggestions for a batch of analyzed failures.
+
+        Failures with identical error text share one suggestion list, computed once.
+        Pass the same groups dict across calls to share it between batches.
+        """
+        if groups is None:
+            groups = {}
+        suggest = self.generate_mcp_suggestions
+        for failure in failures:
+            key = (failure.get("errorMessage") or "", failure.get("errorDetails") or "")
+            suggestions = groups.get(key)
+            if suggestions is None:
+                suggestions = groups[key] = suggest(failure)
+            failure["suggestions"] = suggestions
 
     def generate_mcp_suggestions(self, failure):
         """Generate debugging suggestions using MCP patterns"""
-        suggestions = []
-        error_msg = failure["errorMessage"].lower()
-        error_details = failure["errorDetails"].lower()
-
-        # Network/Connection errors
-        if any(term in error_msg for term in ["net::err", "network", "timeout"]):
-            suggestions.append({
-                "type": "network",
-                "severity": "high",
-                "message": "Network or connection issue detected",
-                "actions": [
-                    "Check if the API server is running and accessible",
-                    "Verify the BASE_URL in your test file is correct",
-                    "Check network connectivity and firewall settings",
-                    "Increase timeout values in playwright.config.ts if the API is slow"
-                ]
-            })
+        error_msg = failure.get("errorMessage") or ""
 
-        # 404 Not Found errors
-        if "404" in error_msg or "not found" in error_details:
-            suggestions.append({
-                "type": "endpoint",
-                "severity": "high",
-                "message": "Endpoint not found (404) - Resource may not exist",
-                "actions": [
-                    "Verify the endpoint path matches the API documentation",
-                    "Check if path parameters are correctly replaced with actual IDs",
-                    "Ensure POST tests run before GET/DELETE operations (use test.describe.serial)",
-                    "Verify resourceIds are being stored correctly after POST requests",
-                    "Check if the resource was actually created before trying to access it"
-                ]
-            })
-
-        # 401/403 Authentication errors
-        if any(code in error_msg for code in ["401", "403"]) or "unauthorized" in error_msg:
-            suggestions.append({
-                "type": "authentication",
-                "severity": "high",
-                "message": "Authentication or authorization issue",
-                "actions": [
-                    "Verify API_KEY is correctly set in the test file",
-                    "Check if the API requires authentication headers",
-                    "Ensure the API key has proper permissions",
-                    "Review authentication requirements in API documentation"
-                ]
-            })
-
-        # 400 Bad Request errors
-        if "400" in error_msg or "bad request" in error_msg:
-            suggestions.append({
-                "type": "request",
-                "severity": "medium",
-                "message": "Bad request - invalid request data",
-                "actions": [
-                    "Review the request payload structure",
-                    "Check if all required fields are included",
-                    "Verify data types match the API schema",
-                    "Ensure JSON format is valid"
-                ]
-            })
+        if KEYWORD_AUTOMATON is not None:
+            hits = {category for _, category in KEYWORD_AUTOMATON.iter(error_msg.lower())}
+        else:
+            hits = {m.lastgroup for m in DISPATCH_RE.finditer(error_msg)}
+        # The (often long) stack in errorDetails is only scanned when the message didn't already say 404
+        if "endpoint" not in hits and NOT_FOUND_RE.search(failure.get("errorDetails") or ""):
+            hits.add("endpoint")
+        if "dependency" not in hits and MISSING_DEPENDENCY_RE.search(error_msg):
+            hits.add("dependency")
 
-        # 500 Server errors
-        if "500" in error_msg or "internal server error" in error_msg:
-            suggestions.append({
-                "type": "server",
-                "severity": "medium",
-                "message": "Server error - API issue",
-                "actions": [
-                    "This may be a server-side issue, not a test problem",
-                    "Check API server logs",
-                    "Verify the API is functioning correctly",
-                    "Try the request manually to confirm"
-                ]
-            })
+        suggestions = [suggestion for s_type, suggestion in SUGGESTIONS.items() if s_type in hits]
 
-        # Assertion failures
-        if any(term in error_msg for term in ["expect", "assertion", "tobe"]):
+        # Status code mismatches
+        if STATUS_CODE_RE.search(error_msg) and EXPECTED_RECEIVED_RE.search(error_msg):
+            codes = dict.fromkeys(STATUS_CODE_RE.findall(error_msg))
             suggestions.append({
-                "type": "assertion",
+                "type": "status",
                 "severity": "medium",
-                "message": "Test assertion failed - Expected vs Actual mismatch",
-                "actions": [
-                    "Review the expected vs actual values in the error message",
-                    "Check if the API response format changed",
-                    "Verify the test expectations match API behavior",
-                    "Consider if the test data is valid for the API",
-                    "Check if status code expectations are correct (200 vs 201 vs 204)"
-                ]
-            })
-
-        # Test dependency issues
-        if "skipping" in error_msg or ("no" in error_msg and "available" in error_msg):
-            suggestions.append({
-                "type": "dependency",
-                "severity": "low",
-                "message": "Missing resource dependency - Test skipped",
-                "actions": [
-                    "Ensure POST tests run before GET/DELETE tests",
-                    "Use test.describe.serial() for sequential execution",
-                    "Check if resourceIds are being stored correctly after POST",
-                    "Verify test execution order matches resource dependencies",
-                    "Review the test generation to ensure proper ordering"
-                ]
+                "message": f"HTTP status code mismatch ({', '.join(codes)})",
+                "actions": STATUS_ACTIONS
             })
 
-        # Status code mismatches
-        if "expected" in error_msg and "received" in error_msg:
-            if any(code in error_msg for code in ["200", "201", "404"]):
-                suggestions.append({
-                    "type": "status",
-                    "severity": "medium",
-                    "message": "HTTP status code mismatch",
-                    "actions": [
-                        "Verify the expected status code matches API documentation",
-                        "Check if the operation actually succeeded (201 for POST, 200 for GET)",
-                        "Review API response to understand why status differs",
-                        "Consider if the endpoint behavior changed"
-                    ]
-                })
-
         return suggestions
 
     def analyze_text_output(self, output):
@@ -374,8 +631,12 @@ class TestDebugger:
 
             if in_failure and line.strip() == "":
                 if current_failure:
-                    current_failure["suggestions"] = self.generate_mcp_suggestions(current_failure)
-                    self.results["failures"].append(current_failure)
+                    if len(self.results["failures"]) < MAX_RETAINED_FAILURES:
+                        current_failure["suggestions"] = self.generate_mcp_suggestions(current_failure)
+                        self.results["failures"].append(current_failure)
+                    else:
+                        self.results["failures_truncated"] += 1
+                        self.count_truncated(current_failure)
                 in_failure = False
                 current_failure = None
 
@@ -413,7 +674,7 @@ class TestDebugger:
 
     def apply_llm_analysis(self):
         """Use LLM (if configured) to provide deeper insights and suggestions."""
-        if not client:
+        if self.get_llm_client() is None:
             return
 
         try:
@@ -426,15 +687,24 @@ class TestDebugger:
             failures = self.results.get("failures", [])
             errors = self.results.get("errors", [])
 
-            # Limit payload size
+            # Limit payload size: near-identical failures are sent once, with how often they occurred
+            failure_groups = {}
+            for f in failures:
+                key = (f.get("errorMessage") or "")[:512]
+                group = failure_groups.get(key)
+                if group is None:
+                    failure_groups[key] = [f, 1]
+                else:
+                    group[1] += 1
             failures_brief = [
                 {
                     "test": f.get("test"),
                     "file": f.get("file"),
                     "status": f.get("status"),
                     "errorMessage": (f.get("errorMessage") or "")[:800],
+                    "count": count,
                 }
-                for f in failures[:30]
+                for f, count in list(failure_groups.values())[:30]
             ]
             errors_brief = [
                 {
@@ -457,33 +727,18 @@ class TestDebugger:
                 "Return a concise analysis with bullets: Root Cause, Evidence, Fixes, Next Checks."
             )
 
-            ai_text = None
-            if LLM_PROVIDER == "anthropic":
-                try:
-                    resp = client.messages.create(
-                        model=MODEL,
-                        max_tokens=1200,
-                        temperature=0,
-                        system=system,
-                        messages=[{"role": "user", "content": user}],
-                    )
-                    ai_text = resp.content[0].text
-                except Exception:
-                    ai_text = None
-            elif LLM_PROVIDER == "openai":
-                try:
-                    resp = client.chat.completions.create(
-                        model=MODEL,
-                        messages=[
-                            {"role": "system", "content": system},
-                            {"role": "user", "content": user},
-                        ],
-                        temperature=0,
-                        max_tokens=1200,
-                    )
-                    ai_text = resp.choices[0].message.content
-                except Exception:
-                    ai_text = None
+            # Responses are deterministic (temperature=0), so identical prompts are served from disk
+            cache_key = hashlib.sha256(
+                json.dumps({"model": MODEL, "system": system, "user": user}, sort_keys=True).encode("utf-8")
+            ).hexdigest()
+            cache_file = self.llm_cache_dir / f"{cache_key}.txt"
+
+            if cache_file.exists():
+                ai_text = cache_file.read_text(encoding="utf-8")
+            else:
+                ai_text = self.call_llm(system, user)
+                if ai_text:
+                    self.write_llm_cache(cache_file, ai_text)
 
             if ai_text:
                 # Attach AI analysis to results for inclusion in report
@@ -492,6 +747,60 @@ class TestDebugger:
             # Non-blocking
             pass
 
+    def get_llm_client(self):
+        """Import the configured provider's SDK and create its client on first use"""
+        if self.llm_client is None:
+            try:
+                if LLM_PROVIDER == "openai" and OPENAI_API_KEY:
+                    from openai import OpenAI
+                    self.llm_client = OpenAI(api_key=OPENAI_API_KEY)
+                elif LLM_PROVIDER == "anthropic" and ANTHROPIC_API_KEY:
+                    from anthropic import Anthropic
+                    self.llm_client = Anthropic(api_key=ANTHROPIC_API_KEY)
+            except Exception:
+                self.llm_client = None
+        return self.llm_client
+
+    def call_llm(self, system, user):
+        """Send one prompt to the configured provider and return its text, or None on failure.
+
+        The deduplicated failures fit in a single request, so the whole analysis is one call.
+        """
+        client = self.llm_client
+        try:
+            if LLM_PROVIDER == "anthropic":
+                resp = client.messages.create(
+                    model=MODEL,
+                    max_tokens=1200,
+                    temperature=0,
+                    system=system,
+                    messages=[{"role": "user", "content": user}],
+                )
+                return resp.content[0].text
+            if LLM_PROVIDER == "openai":
+                resp = client.chat.completions.create(
+                    model=MODEL,
+                    messages=[
+                        {"role": "system", "content": system},
+                        {"role": "user", "content": user},
+                    ],
+                    temperature=0,
+                    max_tokens=1200,
+                )
+                return resp.choices[0].message.content
+        except Exception:
+            return None
+        return None
+
+    def write_llm_cache(self, cache_file, text):
+        """Atomically store an LLM response so concurrent runs never read a partial file"""
+        try:
+            os.makedirs(self.llm_cache_dir, exist_ok=True)
+            write_atomic(cache_file, text.encode("utf-8"))
+        except OSError:
+            # Caching is best-effort
+            pass
+
     def generate_report(self):
         """Generate comprehensive debug report"""
         pass_rate = 0
@@ -507,153 +816,123 @@ class TestDebugger:
                 "passRate": pass_rate
             },
             "failures": self.results["failures"],
+            "failuresTruncated": self.results["failures_truncated"],
             "errors": self.results["errors"],
             "timestamp": datetime.now().isoformat(),
             "toolName": "Playwright Test Debugger",
             "ai": self.results.get("aiAnalysis")
         }
 
-        # Generate text report
-        text_report = f"""
-{'='*80}
-🐛 TEST DEBUG REPORT
-{'='*80}
-
-Summary:
-  Total Tests: {report['summary']['total']}
-  Passed: {report['summary']['passed']} ({report['summary']['passRate']}%)
-  Failed: {report['summary']['failed']}
-  Skipped: {report['summary']['skipped']}
-
-"""
-
-        if report["failures"]:
-            text_report += f"""
-{'='*80}
-FAILED TESTS ANALYSIS
-{'='*80}
-"""
-
-            for failure in report["failures"]:
-                text_report += f"""
-❌ {failure['test']}
-   File: {failure['file']}:{failure['line']}
-   Status: {failure['status']}
-   Duration: {failure['duration']}ms
-   Retry: {failure['retry']}
-
-    Error: {failure['errorMessage'] or 'No error message'}
-"""
-                # If we parsed Expected/Received, add them clearly on their own lines
-                if failure.get('expected') or failure.get('received'):
-                    text_report += f"""
-   Expected: {failure.get('expected') or '—'}
-   Received: {failure.get('received') or '—'}
-"""
-                text_report += """
-    🔍 Debugging Suggestions:
-"""
-
-                for suggestion in failure["suggestions"]:
-                    text_report += f"   [{suggestion['severity'].upper()}] {suggestion['message']}\n"
-                    for action in suggestion["actions"]:
-                        text_report += f"      • {action}\n"
-                    text_report += "\n"
-
-        if report["errors"]:
-            text_report += f"""
-{'='*80}
-EXECUTION ERRORS
-{'='*80}
-"""
-
-            for error in report["errors"]:
-                text_report += f"""
-❌ {error['message']}
-
-   Suggestions:
-"""
-                for suggestion in error["suggestions"]:
-                    for action in suggestion["actions"]:
-                        text_report += f"   • {action}\n"
-
-        # Only show "ALL TESTS PASSED" when at least one test ran
-        if report["summary"]["failed"] == 0 and not report["errors"] and report["summary"]["total"] > 0:
-            text_report += f"""
-{'='*80}
-✅ ALL TESTS PASSED!
-{'='*80}
-"""
-
-        # AI section
-        if report.get("ai"):
-            text_report += f"""
-{'='*80}
-RECOMMENDATIONS
-{'='*80}
-    {report.get("ai")}
-    """
+        # Stream the text report to its file and the console as it is generated
+        json_file = self.json_report_file
+        txt_file = self.txt_report_file
+        stdout_write = sys.stdout.write
+
+        self.reports_dir.mkdir(exist_ok=True)
+        with open(txt_file, "w") as txt_fh:
+            file_write = txt_fh.write
+
+            def emit(chunk):
+                file_write(chunk)
+                stdout_write(chunk)
+
+            emit(REPORT_HEADER_TPL(report["summary"]))
+
+            if report["failures"]:
+                emit(FAILED_TESTS_HEADER)
+
+                for failure in report["failures"]:
+                    emit(FAILURE_TPL(
+                        test=failure["test"],
+                        file=failure["file"],
+                        line=failure["line"],
+                        status=failure["status"],
+                        duration=failure["duration"],
+                        retry=failure["retry"],
+                        error=failure["errorMessage"] or "No error message"
+                    ))
+                    # If we parsed Expected/Received, add them clearly on their own lines
+                    if failure.get('expected') or failure.get('received'):
+                        emit(EXPECTED_RECEIVED_TPL(
+                            expected=failure.get('expected') or '—',
+                            received=failure.get('received') or '—'
+                        ))
+                    emit(SUGGESTIONS_HEADER)
+
+                    for suggestion in failure["suggestions"]:
+                        emit(SUGGESTION_TPL(suggestion["severity"].upper(), suggestion["message"]))
+                        for action in suggestion["actions"]:
+                            emit("      • ")
+                            emit(action)
+                            emit("\n")
+                        emit("\n")
+
+                if report["failuresTruncated"]:
+                    emit(f"... and {report['failuresTruncated']} more failed tests (not retained)\n\n")
+
+            if report["errors"]:
+                emit(EXECUTION_ERRORS_HEADER)
+
+                for error in report["errors"]:
+                    emit(ERROR_TPL(error["message"]))
+                    for suggestion in error["suggestions"]:
+                        for action in suggestion["actions"]:
+                            emit("   • ")
+                            emit(action)
+                            emit("\n")
+
+            # Only show "ALL TESTS PASSED" when at least one test ran
+            if report["summary"]["failed"] == 0 and not report["errors"] and report["summary"]["total"] > 0:
+                emit(ALL_PASSED_BANNER)
+
+            # AI section
+            if report.get("ai"):
+                emit(AI_SECTION_TPL(report.get("ai")))
         
-        recommendations = []
-
-        # If no tests were discovered, provide discovery guidance and skip pass-rate warning
-        if report["summary"]["total"] == 0:
-            recommendations.append("❗ No tests discovered. Verify the test file path and Playwright configuration.")
-            recommendations.append("• Ensure the file exists and matches Playwright's test patterns.")
-            recommendations.append("• Try running: npx playwright test tests --reporter=json")
-            recommendations.append("• If using TypeScript, ensure ts-node is not required for API tests.")
+            recommendations = []
+
+            # If no tests were discovered, provide discovery guidance and skip pass-rate warning
+            if report["summary"]["total"] == 0:
+                recommendations.append("❗ No tests discovered. Verify the test file path and Playwright configuration.")
+                recommendations.append("• Ensure the file exists and matches Playwright's test patterns.")
+                recommendations.append("• Try running: npx playwright test tests --reporter=json")
+                recommendations.append("• If using TypeScript, ensure ts-node is not required for API tests.")
+            else:
+                if report["summary"]["passRate"] < 50:
+                    recommendations.append("⚠️  Less than 50% of tests are passing. Review test suite configuration.")
+
+            # Count failures per suggestion type in a single pass, including those past the cap
+            counts = Counter(self.results["truncated_categories"])
+            if report["failures"] or counts:
+                for failure in report["failures"]:
+                    counts.update({suggestion["type"] for suggestion in failure["suggestions"]})
+
+                if counts["network"]:
+                    recommendations.append(f"🔌 {counts['network']} network-related failures. Check API connectivity.")
+                if counts["endpoint"]:
+                    recommendations.append(f"🔗 {counts['endpoint']} endpoint failures (404). Ensure tests run in serial mode and resources exist.")
+                if counts["authentication"]:
+                    recommendations.append(f"🔐 {counts['authentication']} authentication failures. Check API keys.")
+                if counts["dependency"]:
+                    recommendations.append(f"🔗 {counts['dependency']} dependency issues. Use test.describe.serial() for proper test ordering.")
+
+            if not recommendations and report["summary"]["failed"] == 0:
+                recommendations.append("✅ Test suite is healthy! All tests passing.")
+
+            for rec in recommendations:
+                emit(rec)
+                emit("\n")
+
+            emit(REPORT_FOOTER)
+        stdout_write("\n")
+
+        # Save JSON report
+        if orjson is not None:
+            # Serialize in C and hand the whole buffer to a single write
+            json_file.write_bytes(orjson.dumps(report, option=orjson.OPT_INDENT_2))
         else:
-            if report["summary"]["passRate"] < 50:
-                recommendations.append("⚠️  Less than 50% of tests are passing. Review test suite configuration.")
-
-        if report["summary"]["passRate"] < 50:
-            recommendations.append("⚠️  Less than 50% of tests are passing. Review test suite configuration.")
-
-        if report["failures"]:
-            network_failures = [f for f in report["failures"] 
-                              if any(s["type"] == "network" for s in f["suggestions"])]
-            if network_failures:
-                recommendations.append(f"🔌 {len(network_failures)} network-related failures. Check API connectivity.")
-
-            endpoint_failures = [f for f in report["failures"] 
-                               if any(s["type"] == "endpoint" for s in f["suggestions"])]
-            if endpoint_failures:
-                recommendations.append(f"🔗 {len(endpoint_failures)} endpoint failures (404). Ensure tests run in serial mode and resources exist.")
-
-            auth_failures = [f for f in report["failures"] 
-                           if any(s["type"] == "authentication" for s in f["suggestions"])]
-            if auth_failures:
-                recommendations.append(f"🔐 {len(auth_failures)} authentication failures. Check API keys.")
-
-            dependency_failures = [f for f in report["failures"] 
-                                 if any(s["type"] == "dependency" for s in f["suggestions"])]
-            if dependency_failures:
-                recommendations.append(f"🔗 {len(dependency_failures)} dependency issues. Use test.describe.serial() for proper test ordering.")
-
-        if not recommendations and report["summary"]["failed"] == 0:
-            recommendations.append("✅ Test suite is healthy! All tests passing.")
-
-        for rec in recommendations:
-            text_report += f"{rec}\n"
-
-        text_report += f"\n{'='*80}\n"
-
-        # Create reports directory if it doesn't exist
-        reports_dir = project_root / "reports"
-        os.makedirs(reports_dir, exist_ok=True)
-        
-        # Save reports
-        json_file = reports_dir / "debug_report.json"
-        txt_file = reports_dir / "debug_report.txt"
-        
-        with open(json_file, "w") as f:
-            json.dump(report, f, indent=2)
-
-        with open(txt_file, "w") as f:
-            f.write(text_report)
-
-        # Print report
-        print(text_report)
+            with open(json_file, "w") as f:
+                json.dump(report, f, indent=2)
 
         print(f"\n💾 Detailed JSON report saved to: {json_file}")
         print(f"📄 Text report saved to: {txt_file}")
@@ -1,40 +1,132 @@
 # generate_playwright_tests.py
-import requests
-import json
+import functools
+import io
 import os
+import sys
 from pathlib import Path
 import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+from urllib.parse import urlparse
 
-# Load configuration
-# Get project root (one level up from agents/)
+# Get project root (one level up from scripts/)
 project_root = Path(__file__).parent.parent
-config_path = project_root / "config.json"
-with open(config_path, "r") as f:
-    config = json.load(f)
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
 
-SWAGGER_URL = config.get("swagger_url", "https://fakerestapi.azurewebsites.net/swagger/v1/swagger.json")
-API_KEY = config.get("api_key", "special-key")
+from scripts.config_loader import load_config
+from scripts.spec_loader import SPEC_TIMEOUT, load_cached_spec, new_spec_session
 
+DEFAULT_SWAGGER_URL = "https://fakerestapi.azurewebsites.net/swagger/v1/swagger.json"
+DEFAULT_API_KEY = "special-key"
 
-def load_swagger_spec(url=SWAGGER_URL):
-    response = requests.get(url)
-    response.raise_for_status()
-    return response.json()
+@functools.lru_cache(maxsize=1)
+def _get_cfg():
+    """Project configuration, loaded on first use rather than at import"""
+    return load_config()
+
+# Path parameters like {petId}, {orderId}, {username}, {id}
+_PATH_PARAM_RE = re.compile(r"\{([^}]+)\}")
+# Characters that aren't allowed in the generated file name (each becomes "_"):
+# a translate table covers ASCII titles, the regex handles anything else
+_SAFE_NAME_TABLE = str.maketrans({
+    chr(i): (chr(i).lower() if chr(i).isalnum() else "_") for i in range(128)
+})
+_SAFE_NAME_RE = re.compile(r"\W")
+
+
+# HTTP methods that send a JSON request body
+_BODY_METHODS = frozenset(("POST", "PUT", "PATCH"))
+# Bulk user creation endpoints are not generated
+_SKIPPED_PATHS = frozenset(("/user/createWithList", "/user/createWithArray"))
+
+# Common patterns: {petId} -> 'pet', {orderId} -> 'order', {username} -> 'user'
+_RESOURCE_HINTS = (("pet", "pet"), ("order", "order"), ("user", "user"))
+
+
+@functools.lru_cache(maxsize=None)
+def _resource_hint(param):
+    """resourceIds key implied by a path parameter name, or None (memoized per name)"""
+    param_lower = param.lower()
+    return next((key for word, key in _RESOURCE_HINTS if word in param_lower), None)
+
+
+def _resolve_resource_key(param, resource_name):
+    """Map a path parameter name to the resourceIds key that holds its value"""
+    # Default to the resource_name we extracted from path
+    return _resource_hint(param) or resource_name
+
+
+# Shared HTTP session for single-spec fetches
+_SESSION = new_spec_session()
+# Upper bound on concurrent fetches when several spec URLs are given
+_MAX_FETCH_WORKERS = 4
+
+def load_swagger_spec(url=None, session=None):
+    if url is None:
+        url = _get_cfg().get("swagger_url", DEFAULT_SWAGGER_URL)
+    # Shared on-disk cache, revalidated with a conditional GET
+    return load_cached_spec(url, session or _SESSION, timeout=SPEC_TIMEOUT)
+
+
+def _load_spec_own_session(url):
+    """Fetch one spec on a session of its own (requests sessions aren't thread-safe)"""
+    with new_spec_session() as session:
+        return load_swagger_spec(url, session)
+
+
+def load_swagger_specs(urls):
+    """Fetch and parse several specs concurrently, returned in the order of urls.
+
+    Each fetch goes through the shared spec cache, so N specs take roughly the
+    slowest round-trip instead of the sum of all of them.
+    """
+    urls = list(urls)
+    if len(urls) <= 1:
+        return [load_swagger_spec(url) for url in urls]
+    with ThreadPoolExecutor(max_workers=min(len(urls), _MAX_FETCH_WORKERS)) as pool:
+        return list(pool.map(_load_spec_own_session, urls))
+
+
+class Endpoint(NamedTuple):
+    """Lightweight endpoint record: smaller than a dict, with attribute access"""
+    path: str
+    method: str
+    summary: str
+    parameters: list
+    responses: dict
+    consumes: list
+
+
+def as_endpoint(ep):
+    """Coerce an endpoint dict (e.g. from the advanced generator) into an Endpoint"""
+    if isinstance(ep, Endpoint):
+        return ep
+    return Endpoint(
+        ep["path"],
+        ep["method"],
+        ep.get("summary", ""),
+        ep.get("parameters", []),
+        ep.get("responses", {}),
+        ep.get("consumes", [])
+    )
 
 
 def get_endpoints(spec):
     paths = spec.get("paths", {})
     endpoints = []
+    ap = endpoints.append
     for path, methods in paths.items():
         for method, details in methods.items():
-            endpoints.append({
-                "path": path,
-                "method": method.upper(),
-                "summary": details.get("summary", ""),
-                "parameters": details.get("parameters", []),
-                "responses": details.get("responses", {}),
-                "consumes": details.get("consumes", [])
-            })
+            get = details.get
+            ap(Endpoint(
+                path,
+                method.upper(),
+                get("summary", ""),
+                get("parameters", []),
+                get("responses", {}),
+                get("consumes", [])
+            ))
     return endpoints
 
 
@@ -59,7 +151,6 @@ def get_base_url_from_spec(spec, swagger_url=None):
     
     # Fallback: extract from swagger_url if provided
     if swagger_url:
-        from urllib.parse import urlparse
         parsed = urlparse(swagger_url)
         # Remove /swagger/v1/swagger.json or similar paths
         base = f"{parsed.scheme}://{parsed.netloc}"
@@ -76,118 +167,128 @@ def get_base_url_from_spec(spec, swagger_url=None):
     return "https://api.example.com"
 
 
-def generate_playwright_tests(spec, endpoints):
-    # Get base URL from spec
-    from urllib.parse import urlparse
-    
-    # Try OpenAPI 3.0 format first
-    if "servers" in spec and spec["servers"]:
-        full_base_url = spec["servers"][0].get("url", "").rstrip("/")
-    else:
-        # Swagger 2.0 format
-        host = spec.get("host", "")
-        base_path = spec.get("basePath", "")
-        scheme = spec.get("schemes", ["https"])[0] if spec.get("schemes") else "https"
-        if host:
-            full_base_url = f"{scheme}://{host}{base_path}".rstrip("/")
-        else:
-            # Fallback: extract from config
-            from scripts.config_loader import get_swagger_url
-            swagger_url = get_swagger_url()
-            parsed = urlparse(swagger_url)
-            full_base_url = f"{parsed.scheme}://{parsed.netloc}".rstrip("/")
+def generate_playwright_tests(spec, endpoints, swagger_url=None):
+    """Return the generated Playwright spec file as a single string"""
+    buffer = io.StringIO()
+    write_playwright_tests(spec, endpoints, buffer, swagger_url)
+    return buffer.getvalue()
+
+
+def write_playwright_tests(spec, endpoints, out, swagger_url=None):
+    """Stream the generated Playwright spec file to a writable text file object.
+
+    Tests are written fragment by fragment as they are generated, so neither the
+    file nor a whole test is ever held in memory. swagger_url is where the spec was
+    fetched from (default: the configured one); the base URL falls back to it when
+    the spec names no server. Returns the number of tests written.
+    """
+    write = out.write
+
+    # Get base URL from spec, falling back to the URL the spec came from
+    if swagger_url is None:
+        swagger_url = _get_cfg().get("swagger_url", DEFAULT_SWAGGER_URL)
+    full_base_url = get_base_url_from_spec(spec, swagger_url)
     
     # Get API name
     api_info = spec.get("info", {})
     api_title = api_info.get("title", "API")
+    api_key = _get_cfg().get("api_key", DEFAULT_API_KEY)
     
-    test_code = f"""import {{ test, expect }} from '@playwright/test';
+    write(f"""import {{ test, expect }} from '@playwright/test';
 
 const BASE_URL = '{full_base_url}';
-const API_KEY = '{API_KEY}';
+const API_KEY = '{api_key}';
 
 let resourceIds: Record<string, any> = {{}};
 
 test.describe.serial('{api_title} - API Tests', () => {{
-"""
+""")
 
-    # Separate tests into three groups for proper ordering
-    post_tests = []  # POST endpoints - create resources first
-    get_list_tests = []  # GET endpoints without IDs - can run after POST
-    dependent_tests = []  # Tests that need resource IDs (GET/PUT/DELETE with {id})
+    # Categorize and generate in one pass, emitting tests in the correct order:
+    # 1. POST tests first (to create resources) are streamed out as soon as they're seen
+    # 2. GET list tests (don't need IDs, but run after POST) are held back
+    # 3. Dependent tests (use stored IDs from POST) are held back to run last
+    # Only the endpoint records are held, never their generated code.
+    writelines = out.writelines
+    get_list_eps = []
+    dependent_eps = []
+    test_count = 0
     
     for ep in endpoints:
-        path = ep['path']
-        method = ep['method']
-        consumes = ep.get("consumes", [])
+        ep = as_endpoint(ep)
+        path = ep.path
+        method = ep.method
+        consumes = ep.consumes
         
         # Skip form-data and multipart uploads
         if "multipart/form-data" in consumes or "application/x-www-form-urlencoded" in consumes:
             continue
         
         # Skip bulk user creation endpoints
-        if path in ["/user/createWithList", "/user/createWithArray"]:
+        if path in _SKIPPED_PATHS:
             continue
         
-        # Categorize tests properly
-        if method == "POST" and "{" not in path:
+        test_count += 1
+        has_path_params = "{" in path
+        if method == "POST" and not has_path_params:
             # POST endpoints create resources - run first
-            post_tests.append(ep)
-        elif method == "GET" and "{" not in path:
+            writelines(iter_test_code(ep, use_stored_id=False))
+        elif method == "GET" and not has_path_params:
             # GET list endpoints - run after POST but before dependent tests
-            get_list_tests.append(ep)
-        elif "{" in path:
-            # Tests that need resource IDs (GET /pet/{id}, PUT /pet/{id}, DELETE /pet/{id})
-            dependent_tests.append(ep)
+            get_list_eps.append(ep)
         else:
-            # Other methods (PUT, DELETE without IDs) - add to dependent
-            dependent_tests.append(ep)
-    
-    # Generate tests in correct order:
-    # 1. POST tests first (to create resources)
-    for ep in post_tests:
-        test_code += generate_test_code(ep, use_stored_id=False)
+            # Tests that need resource IDs (GET /pet/{id}, PUT /pet/{id}, DELETE /pet/{id})
+            # and other methods (PUT, DELETE without IDs) - add to dependent
+            dependent_eps.append(ep)
     
-    # 2. GET list tests (don't need IDs, but run after POST)
-    for ep in get_list_tests:
-        test_code += generate_test_code(ep, use_stored_id=False)
+    for ep in get_list_eps:
+        writelines(iter_test_code(ep, use_stored_id=False))
+    for ep in dependent_eps:
+        writelines(iter_test_code(ep, use_stored_id=True))
     
-    # 3. Dependent tests (use stored IDs from POST)
-    for ep in dependent_tests:
-        test_code += generate_test_code(ep, use_stored_id=True)
+    write("""});
+""")
     
-    test_code += """});
+    return test_count
+
+
+# Fixed TypeScript fragments shared by every generated test
+_CT_HEADER = """
+      headers: {
+        'Content-Type': 'application/json',"""
+_APIKEY_HEADER = """
+        'api_key': API_KEY,"""
+_HEADERS_END = """
+      },"""
+_EMPTY_DATA = """
+      data: {},"""
+_TEST_CLOSE = """
+  });
 """
-    
-    return test_code
 
 
 def generate_test_code(ep, use_stored_id=False):
-    path = ep['path']
-    method = ep['method']
-    summary = ep['summary']
-    responses = ep['responses']
-    parameters = ep['parameters']
+    return "".join(iter_test_code(ep, use_stored_id))
+
+
+def iter_test_code(ep, use_stored_id=False):
+    """Yield the code for one endpoint's test fragment by fragment"""
+    path, method, summary, parameters, responses, _ = as_endpoint(ep)
     
-    # Determine headers
-    headers = {}
-    for p in parameters:
-        if p.get("name") == "api_key":
-            headers["api_key"] = "API_KEY"
+    # Determine headers (stop at the first matching parameter)
+    has_api_key = any(p.get("name") == "api_key" for p in parameters)
     
     # Determine payload
     payload = None
-    body_params = [p for p in parameters if p.get("in") == "body"]
-    if body_params and method in ["POST", "PUT", "PATCH"]:
-        schema = body_params[0].get("schema", {})
+    body_param = next((p for p in parameters if p.get("in") == "body"), None)
+    if body_param is not None and method in _BODY_METHODS:
         # Generate payload based on endpoint
         if "permission" in path.lower():
             payload = "{ id: 1, name: 'TestResource' }"
         else:
             payload = "{ id: 1 }"
     
-    # Determine expected status
-    expected_status = 200
+    # Determine expected status: 200/201/204 if declared, else the lowest 2xx, else 200
     if "200" in responses:
         expected_status = 200
     elif "201" in responses:
@@ -195,100 +296,75 @@ def generate_test_code(ep, use_stored_id=False):
     elif "204" in responses:
         expected_status = 204
     else:
-        for status in sorted(responses.keys()):
+        lowest_2xx = None
+        for status in responses:
             if status.isdigit():
                 status_int = int(status)
-                if 200 <= status_int < 300:
-                    expected_status = status_int
-                    break
-    
-    if not any(str(s).startswith('2') for s in responses.keys() if str(s).isdigit()):
-        if method in ["POST", "PUT", "PATCH", "GET"]:
-            expected_status = 200
+                if 200 <= status_int < 300 and (lowest_2xx is None or status_int < lowest_2xx):
+                    lowest_2xx = status_int
+        expected_status = lowest_2xx or 200
     
     # Generate test name
     test_name = f"{method} {path}"
     if summary:
         test_name = f"{method} {path} - {summary}"
     
-    # Extract resource name from path
-    path_parts = path.split('/')
+    # Extract resource name from path (only needed for ID lookups and POSTs)
     resource_name = None
-    for i, part in enumerate(path_parts):
-        if '{' in part and i > 0:
-            resource_name = path_parts[i-1]
-            break
+    if '{' in path or method == "POST":
+        path_parts = path.split('/')
+        for i, part in enumerate(path_parts):
+            if '{' in part and i > 0:
+                resource_name = path_parts[i-1]
+                break
     
-    if not resource_name and method == "POST":
-        resource_name = path_parts[-1]
+        if not resource_name and method == "POST":
+            resource_name = path_parts[-1]
     
     # Build test code
-    test_code = f"""
+    yield f"""
   test('{test_name}', async ({{ request }}) => {{"""
     
     if use_stored_id and resource_name:
-        test_code += f"""
+        yield f"""
     // Skip if resource ID not available
     if (!resourceIds['{resource_name}']) {{
       console.log('Skipping - no {resource_name} ID available');
       return;
     }}"""
         
-        # Replace ALL path parameters with stored IDs dynamically
-        dynamic_path = path
-        
-        # Find all path parameters like {petId}, {orderId}, {username}, {id}, etc.
-        path_params = re.findall(r'\{(\w+)\}', path)
-        
-        for param in path_params:
-            # Map parameter names to resource keys
-            # Common patterns: {petId} -> 'pet', {orderId} -> 'order', {username} -> 'user'
-            param_lower = param.lower()
-            
-            # Determine which resource key to use
-            if 'pet' in param_lower:
-                resource_key = 'pet'
-            elif 'order' in param_lower:
-                resource_key = 'order'
-            elif 'user' in param_lower or 'username' in param_lower:
-                resource_key = 'user'
-            else:
-                # Default to the resource_name we extracted from path
-                resource_key = resource_name
-            
-            # Replace {paramName} with ${resourceIds['resourceKey']}
-            dynamic_path = dynamic_path.replace(f'{{{param}}}', f'${{resourceIds[\'{resource_key}\']}}')
+        # Replace ALL path parameters with stored IDs in a single pass:
+        # {paramName} -> ${resourceIds['resourceKey']}
+        dynamic_path = _PATH_PARAM_RE.sub(
+            lambda m: "${resourceIds['" + _resolve_resource_key(m.group(1), resource_name) + "']}",
+            path
+        )
         
-        test_code += f"""
+        yield f"""
     
     const response = await request.{method.lower()}(`${{BASE_URL}}{dynamic_path}`, {{"""
     else:
-        test_code += f"""
+        yield f"""
     const response = await request.{method.lower()}(`${{BASE_URL}}{path}`, {{"""
     
     # Determine if we need Content-Type header (POST/PUT/PATCH with body)
-    needs_content_type = body_params and method in ["POST", "PUT", "PATCH"]
+    needs_content_type = body_param is not None and method in _BODY_METHODS
     
     # Build request object
-    if needs_content_type or headers or payload:
-        test_code += f"""
-      headers: {{
-        'Content-Type': 'application/json',"""
-        if headers:
-            test_code += f"""
-        'api_key': API_KEY,"""
-        test_code += f"""
-      }},"""
+    if needs_content_type or has_api_key or payload:
+        yield _CT_HEADER
+        if has_api_key:
+            yield _APIKEY_HEADER
+        yield _HEADERS_END
         
         if payload:
-            test_code += f"""
+            yield f"""
       data: {payload},"""
         elif needs_content_type:
             # Add empty data object for POST/PUT/PATCH even if no payload generated
-            test_code += f"""
-      data: {{}},"""
+            yield _EMPTY_DATA
     
-    test_code += f"""
+    yield f"""
     }});
     
     expect(response.status()).toBe({expected_status});"""
@@ -297,7 +373,7 @@ def generate_test_code(ep, use_stored_id=False):
     if method == "POST" and not use_stored_id and resource_name:
         # Handle different response structures
         if resource_name == "user":
-            test_code += f"""
+            yield f"""
     
     // Store the created resource ID for later tests
     if (response.ok()) {{
@@ -312,7 +388,7 @@ def generate_test_code(ep, use_stored_id=False):
       }}
     }}"""
         else:
-            test_code += f"""
+            yield f"""
     
     // Store the created resource ID for later tests
     if (response.ok()) {{
@@ -329,40 +405,76 @@ def generate_test_code(ep, use_stored_id=False):
       console.error('Error response:', errorBody);
     }}"""
     
-    test_code += """
-  });
-"""
+    yield _TEST_CLOSE
     
-    return test_code
 
 
-# Generate tests
-spec = load_swagger_spec()
-endpoints = get_endpoints(spec)
-playwright_tests = generate_playwright_tests(spec, endpoints)
+def spec_file_name(spec):
+    """Test file name for a spec, <api_name>.spec.ts, derived from its title (or host)"""
+    api_info = spec.get("info", {})
+    api_title = api_info.get("title", "API")
+    if api_title.isascii():
+        api_name = api_title.translate(_SAFE_NAME_TABLE).strip("_")
+    else:
+        api_name = _SAFE_NAME_RE.sub("_", api_title).lower().strip("_")
+    if not api_name:
+        host = spec.get("host", "")
+        api_name = host.split(".")[0] if host and "." in host else "api_tests"
+    return f"{api_name}.spec.ts"
 
-# Generate test file name from API spec
-api_info = spec.get("info", {})
-api_title = api_info.get("title", "API")
-api_name = "".join(c.lower() if c.isalnum() else "_" for c in api_title).strip("_")
-if not api_name:
-    host = spec.get("host", "")
-    api_name = host.split(".")[0] if host and "." in host else "api_tests"
-
-output_file = project_root / "tests" / f"{api_name}.spec.ts"
-
-# Save to file
-os.makedirs(output_file.parent, exist_ok=True)
-with open(output_file, "w") as f:
-    f.write(playwright_tests)
-
-test_count = len([line for line in playwright_tests.split('\n') if 'test(' in line])
-print(f"✅ Playwright tests generated: {output_file}")
-print(f"📝 Generated {test_count} test cases")
-print(f"\n🔄 Test Strategy:")
-print(f"   1. POST requests create resources and store their IDs")
-print(f"   2. GET/PUT/DELETE requests use stored IDs")
-print(f"   3. Tests with missing IDs are skipped gracefully")
-print(f"\nTo run the tests:")
-print(f"  npx playwright test")
-print(f"  npx playwright show-report")
+
+def _unique_file_name(file_name, taken):
+    """file_name, or file_name with a _2, _3, ... suffix if it is already in taken"""
+    stem = file_name[:-len(".spec.ts")]
+    suffix = 1
+    while file_name in taken:
+        suffix += 1
+        file_name = f"{stem}_{suffix}.spec.ts"
+    return file_name
+
+
+def write_spec_tests(spec, swagger_url=None, file_name=None):
+    """Write tests/<file_name> for one spec; returns (output_file, test_count)
+
+    file_name defaults to spec_file_name(spec); swagger_url is where the spec came from.
+    """
+    endpoints = get_endpoints(spec)
+    output_file = project_root / "tests" / (file_name or spec_file_name(spec))
+
+    # Stream tests straight to file; the writer counts tests as it goes, and the
+    # fixed UTF-8 codec encodes each chunk in C regardless of the platform locale
+    os.makedirs(output_file.parent, exist_ok=True)
+    with open(output_file, "w", encoding="utf-8", newline="\n") as f:
+        test_count = write_playwright_tests(spec, endpoints, f, swagger_url)
+    return output_file, test_count
+
+
+def main():
+    """Write tests/<api_name>.spec.ts for each spec URL given on the command line.
+
+    With no arguments the configured swagger_url is used.
+    """
+    urls = sys.argv[1:] or [_get_cfg().get("swagger_url", DEFAULT_SWAGGER_URL)]
+    # Specs with the same (or no) title would otherwise overwrite each other's file
+    taken = set()
+    for url, spec in zip(urls, load_swagger_specs(urls)):
+        file_name = spec_file_name(spec)
+        unique_name = _unique_file_name(file_name, taken)
+        if unique_name != file_name:
+            print(f"⚠️  {url}: {file_name} is already generated for an earlier spec, writing {unique_name}")
+        taken.add(unique_name)
+        output_file, test_count = write_spec_tests(spec, url, unique_name)
+        print(f"✅ Playwright tests generated: {output_file}")
+        print(f"📝 Generated {test_count} test cases")
+
+    print(f"\n🔄 Test Strategy:")
+    print(f"   1. POST requests create resources and store their IDs")
+    print(f"   2. GET/PUT/DELETE requests use stored IDs")
+    print(f"   3. Tests with missing IDs are skipped gracefully")
+    print(f"\nTo run the tests:")
+    print(f"  npx playwright test")
+    print(f"  npx playwright show-report")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,32 @@
 # Main test generation script
 # Generates Playwright API tests from Swagger/OpenAPI specs (optional LLM)
 
-import requests
+import functools
+import hashlib
+import io
 import json
 import os
+import re
 import subprocess
 import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
+from urllib.parse import urlparse
+
+# Optional streaming JSON parser: decodes the spec as it is downloaded
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Optional fast JSON serializer for the prompt payloads
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Get project root (one level up from scripts/)
 project_root = Path(__file__).parent.parent
@@ -16,6 +35,11 @@ project_root = Path(__file__).parent.parent
 if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
+from scripts.config_loader import write_atomic
+from scripts.spec_loader import SPEC_TIMEOUT, load_cached_spec, new_spec_session
+# Schema-only generator, used directly and as the fallback for AI generation
+from scripts.generate_playwright_tests import spec_file_name, write_playwright_tests
+
 # Load configuration directly from config.json (no loader)
 def _load_config_from_json(cfg_path: Path) -> dict:
     try:
@@ -45,32 +69,41 @@ MODEL_ALIASES = {
     "got-40": "gpt-4o",
 }
 MODEL = MODEL_ALIASES.get(MODEL, MODEL)
+# The one test-plan call and the per-endpoint code generation can use different models
+# (e.g. a smaller, cheaper one for the many generation calls); both default to 'model'
+PLAN_MODEL = _cfg.get("plan_model", MODEL)
+PLAN_MODEL = MODEL_ALIASES.get(PLAN_MODEL, PLAN_MODEL)
+CODEGEN_MODEL = _cfg.get("codegen_model", MODEL)
+CODEGEN_MODEL = MODEL_ALIASES.get(CODEGEN_MODEL, CODEGEN_MODEL)
+LLM_CACHE_DIR = project_root / ".llm_cache"
+# Concurrent per-endpoint LLM requests (bounded to stay under provider rate limits)
+LLM_MAX_WORKERS = max(1, int(_cfg.get("llm_max_workers", 8)))
+# Provider SDK retries for rate limits (429), 5xx and timeouts, with exponential backoff and jitter
+LLM_MAX_RETRIES = max(0, int(_cfg.get("llm_max_retries", 5)))
 FALLBACK_TO_SCHEMA = bool(_cfg.get("fallback_to_schema", True))
 USE_AI_FOR_TESTS = bool(_cfg.get("use_ai_for_tests", False))
 
-# Debug: Print config status
-if LLM_PROVIDER != "none":
-    print(f"🔧 Config: LLM Provider = {LLM_PROVIDER}")
-    print(f"🔧 Config: OpenAI API Key present = {bool(OPENAI_API_KEY)}")
-    print(f"🔧 Config: Anthropic API Key present = {bool(ANTHROPIC_API_KEY)}")
-    print(f"🔧 Config: use_ai_for_tests = {bool(USE_AI_FOR_TESTS)}")
-
-# Initialize LLM client based on provider
-client = None
-# Only initialize AI client when AI-based test generation is enabled
-if USE_AI_FOR_TESTS:
+
+@functools.lru_cache(maxsize=1)
+def _get_client():
+    """Create the LLM client on first use, so importing this module never loads a provider SDK"""
+    # Only initialize AI client when AI-based test generation is enabled
+    if not USE_AI_FOR_TESTS:
+        return None
     if LLM_PROVIDER == "anthropic" and ANTHROPIC_API_KEY:
         try:
             from anthropic import Anthropic
-            client = Anthropic(api_key=ANTHROPIC_API_KEY)
+            client = Anthropic(api_key=ANTHROPIC_API_KEY, max_retries=LLM_MAX_RETRIES)
             print(f"🤖 Using Anthropic Claude: {MODEL}")
+            return client
         except ImportError:
             print("⚠️  Anthropic package not installed. Run: pip install anthropic")
     elif LLM_PROVIDER == "openai" and OPENAI_API_KEY:
         try:
             from openai import OpenAI
-            client = OpenAI(api_key=OPENAI_API_KEY)
+            client = OpenAI(api_key=OPENAI_API_KEY, max_retries=LLM_MAX_RETRIES)
             print(f"🤖 Using OpenAI: {MODEL}")
+            return client
         except ImportError as e:
             print(f"⚠️  OpenAI package not installed. Run: pip install openai")
             print(f"   Error: {e}")
@@ -82,63 +115,184 @@ if USE_AI_FOR_TESTS:
     elif LLM_PROVIDER == "anthropic" and not ANTHROPIC_API_KEY:
         print("⚠️  Anthropic provider selected but 'anthropic_api_key' not found in config.json")
         print("   Please add 'anthropic_api_key' to your config.json")
+    return None
+
+
+# Shared HTTP session for spec fetches
+_SESSION = new_spec_session()
+
+
+def _parse_spec_stream(response):
+    """Parse the spec straight off the socket as ijson reads it"""
+    # Let urllib3 undo gzip/deflate content encoding as ijson reads
+    response.raw.decode_content = True
+    return next(ijson.items(response.raw, "", use_float=True))
 
 
 def load_swagger_spec(url=SWAGGER_URL):
-    """Load Swagger/OpenAPI specification"""
-    response = requests.get(url)
-    response.raise_for_status()
-    return response.json()
+    """Load Swagger/OpenAPI specification.
+
+    The parsed spec is cached on disk and only downloaded again when the server
+    reports a new ETag/Last-Modified. With ijson installed the body is parsed
+    straight off the socket, so the raw document is never buffered alongside
+    the parsed one.
+    """
+    if ijson is None:
+        return load_cached_spec(url, _SESSION, timeout=SPEC_TIMEOUT)
+    return load_cached_spec(url, _SESSION, timeout=SPEC_TIMEOUT, parse=_parse_spec_stream, stream=True)
+
+
+# Operations that get a generated test
+_HTTP_METHODS = frozenset(("GET", "POST", "PUT", "DELETE", "PATCH"))
+# Endpoints the suite builder leaves out: form uploads and the bulk user creators
+_FORM_CONTENT_TYPES = frozenset(("multipart/form-data", "application/x-www-form-urlencoded"))
+_SKIPPED_PATHS = frozenset(("/user/createWithList", "/user/createWithArray"))
+
+
+def _body_schema(parameters, definitions):
+    """Schema of the body parameter, with a top-level $ref resolved against definitions"""
+    body_param = next((p for p in parameters if p.get("in") == "body"), None)
+    if body_param is None:
+        return {}
+    schema = body_param.get("schema", {})
+    if "$ref" in schema:
+        return definitions.get(schema["$ref"].split("/")[-1], {})
+    return schema
 
 
 def get_endpoints(spec):
-    """Extract endpoints from Swagger spec"""
+    """Extract endpoints from Swagger spec, resolving body schemas in the same pass"""
     paths = spec.get("paths", {})
     definitions = spec.get("definitions", {})
     endpoints = []
+    append = endpoints.append
     for path, methods in paths.items():
         for method, details in methods.items():
-            if method.upper() in ["GET", "POST", "PUT", "DELETE", "PATCH"]:
-                endpoints.append({
-                    "path": path,
-                    "method": method.upper(),
-                    "summary": details.get("summary", ""),
-                    "description": details.get("description", ""),
-                    "parameters": details.get("parameters", []),
-                    "responses": details.get("responses", {}),
-                    "consumes": details.get("consumes", []),
-                    "definitions": definitions
-                })
+            method = method.upper()
+            if method not in _HTTP_METHODS:
+                continue
+            get = details.get
+            parameters = get("parameters", [])
+            append({
+                "path": path,
+                "method": method,
+                "summary": get("summary", ""),
+                "description": get("description", ""),
+                "parameters": parameters,
+                "responses": get("responses", {}),
+                "consumes": get("consumes", []),
+                "schema": _body_schema(parameters, definitions)
+            })
     return endpoints
 
 
-def call_llm(system_prompt, user_prompt, temperature=0.5):
-    """Universal LLM caller that works with multiple providers"""
-    if not client:
+# Responses already produced (or being produced) in this run, keyed by cache file,
+# so identical prompts from concurrent workers share one request
+_LLM_CALLS = {}
+_LLM_CALLS_LOCK = threading.Lock()
+
+
+def call_llm(system_prompt, user_prompt, temperature=0.5, model=None):
+    """Universal LLM caller that works with multiple providers (model defaults to MODEL).
+
+    Responses are cached on disk by prompt, so regenerating the same endpoints
+    doesn't pay for the same request twice; within a run, a prompt that is
+    already in flight waits for that response instead of sending a duplicate.
+    """
+    if not _get_client():
         return None
     
+    model = model or MODEL
+    cache_file = _llm_cache_file(system_prompt, user_prompt, temperature, model)
+    with _LLM_CALLS_LOCK:
+        pending = _LLM_CALLS.get(cache_file)
+        if pending is None:
+            pending = _LLM_CALLS[cache_file] = Future()
+            owner = True
+        else:
+            owner = False
+    if not owner:
+        return pending.result()
+    
+    text = None
+    try:
+        if cache_file.exists():
+            text = cache_file.read_text(encoding="utf-8")
+        else:
+            text = _request_llm(system_prompt, user_prompt, temperature, model)
+            if text:
+                _write_llm_cache(cache_file, text)
+    finally:
+        if not text:
+            # Let a later call retry a failed request
+            with _LLM_CALLS_LOCK:
+                _LLM_CALLS.pop(cache_file, None)
+        pending.set_result(text)
+    return text
+
+
+def _llm_cache_file(system_prompt, user_prompt, temperature, model):
+    """Disk cache entry for a prompt under the configured provider and the given model"""
+    cache_key = hashlib.sha256(
+        json.dumps({
+            "provider": LLM_PROVIDER,
+            "model": model,
+            "system": system_prompt,
+            "user": user_prompt,
+            "temperature": temperature,
+        }, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    return LLM_CACHE_DIR / f"{cache_key}.txt"
+
+
+def _write_llm_cache(cache_file, text):
+    """Atomically store an LLM response so concurrent runs never read a partial file"""
+    try:
+        os.makedirs(LLM_CACHE_DIR, exist_ok=True)
+        write_atomic(cache_file, text.encode("utf-8"))
+    except OSError:
+        # Caching is best-effort
+        pass
+
+
+@functools.lru_cache(maxsize=8)
+def _prompt_cache_key(system_prompt):
+    """OpenAI prompt_cache_key for a system prompt (the prompts are module constants)"""
+    system_digest = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16]
+    return f"playwright-testgen-{system_digest}"
+
+
+def _request_llm(system_prompt, user_prompt, temperature, model):
+    """Send one prompt to the configured provider and return its text, or None on failure"""
+    client = _get_client()
+    # Requests sharing a system prompt are routed together so OpenAI's prefix cache hits
+    # (sent via extra_body so older SDK versions pass it through untouched)
+    prompt_cache = {"prompt_cache_key": _prompt_cache_key(system_prompt)}
     try:
         if LLM_PROVIDER == "anthropic":
             response = client.messages.create(
-                model=MODEL,
+                model=model,
                 max_tokens=4000,
                 temperature=temperature,
+                # No cache_control: the shared prefix (system prompt plus fixed instructions,
+                # ~250 tokens) is below Anthropic's 1024-token minimum cacheable length
                 system=system_prompt,
                 messages=[{"role": "user", "content": user_prompt}]
             )
             return response.content[0].text
         elif LLM_PROVIDER == "openai":
             # Use Responses API for reasoning models (o1 family)
-            if MODEL.startswith("o1"):
+            if model.startswith("o1"):
                 try:
                     resp = client.responses.create(
-                        model=MODEL,
+                        model=model,
                         input=[
                             {"role": "system", "content": system_prompt},
                             {"role": "user", "content": user_prompt},
                         ],
                         temperature=temperature,
                         max_output_tokens=4000,
+                        extra_body=prompt_cache,
                     )
                     # Prefer aggregated text output if available
                     if hasattr(resp, "output_text") and resp.output_text:
@@ -158,18 +312,19 @@ def call_llm(system_prompt, user_prompt, temperature=0.5):
                         return "\n".join(parts) if parts else None
                     return None
                 except Exception as e:
-                    print(f"   ⚠️  OpenAI Responses API error (model={MODEL}): {e}")
+                    print(f"   ⚠️  OpenAI Responses API error (model={model}): {e}")
                     return None
             else:
                 # Default: Chat Completions for GPT-4o family
                 response = client.chat.completions.create(
-                    model=MODEL,
+                    model=model,
                     messages=[
                         {"role": "system", "content": system_prompt},
                         {"role": "user", "content": user_prompt}
                     ],
                     temperature=temperature,
-                    max_tokens=4000
+                    max_tokens=4000,
+                    extra_body=prompt_cache
                 )
                 return response.choices[0].message.content
     except Exception as e:
@@ -177,22 +332,62 @@ def call_llm(system_prompt, user_prompt, temperature=0.5):
         return None
 
 
-def generate_test_plan_with_agent(spec, endpoints):
-    """Use LLM agent to analyze API and create a test generation plan"""
-    if not client:
-        return None
-    
-    endpoint_summary = []
-    for ep in endpoints[:20]:  # Limit for token efficiency
-        endpoint_summary.append(f"- {ep['method']} {ep['path']}: {ep['summary']}")
-    
-    system_prompt = """You are an expert API test generator using Playwright. 
+# Path keyword -> resource group, checked in order (first match wins)
+_RESOURCE_KEYWORDS = (('pet', 'pet'), ('order', 'order'), ('store', 'order'), ('user', 'user'))
+# Resource groups in test order; adding a keyword above is enough to add a group
+_RESOURCE_GROUPS = tuple(dict.fromkeys(group for _, group in _RESOURCE_KEYWORDS))
+# Endpoints described to the planner (limit for token efficiency)
+PLAN_MAX_ENDPOINTS = 20
+# Planner priority after creators (POST without path params): updates/deletes, then reads
+_PLAN_METHOD_RANK = {'PUT': 1, 'DELETE': 1, 'GET': 2}
+
+
+@functools.lru_cache(maxsize=None)
+def _resource_group(path):
+    """Resource group a path belongs to, or None if it matches no known resource (memoized per path)"""
+    lower_path = path.lower()
+    return next((group for keyword, group in _RESOURCE_KEYWORDS if keyword in lower_path), None)
+
+
+def _plan_rank(ep):
+    """Sort key putting the endpoints that drive resource ordering first"""
+    if ep['method'] == 'POST' and '{' not in ep['path']:
+        return 0
+    return _PLAN_METHOD_RANK.get(ep['method'], 3)
+
+
+def _plan_endpoints(endpoints, limit=PLAN_MAX_ENDPOINTS):
+    """Pick the endpoints to describe to the planner, covering each (method, resource) first"""
+    representatives = []
+    extras = []
+    seen = set()
+    for ep in sorted(endpoints, key=_plan_rank):
+        key = (ep['method'], _resource_group(ep['path']))
+        if key in seen:
+            extras.append(ep)
+        else:
+            seen.add(key)
+            representatives.append(ep)
+    return sorted((representatives + extras)[:limit], key=_plan_rank)
+
+
+_PLAN_SYSTEM_PROMPT = """You are an expert API test generator using Playwright. 
 Analyze the API specification and create a comprehensive test generation plan.
 Focus on:
 1. Test execution order (POST before GET/DELETE)
 2. Resource dependencies
 3. Test data requirements
 4. Expected responses"""
+
+
+def generate_test_plan_with_agent(spec, endpoints):
+    """Use LLM agent to analyze API and create a test generation plan"""
+    if not _get_client():
+        return None
+    
+    endpoint_summary = "\n".join(
+        f"- {ep['method']} {ep['path']}: {ep['summary']}" for ep in _plan_endpoints(endpoints)
+    )
     
     user_prompt = f"""Analyze this API specification and create a test generation plan:
 
@@ -200,7 +395,7 @@ API Title: {spec.get('info', {}).get('title', 'Unknown')}
 Base URL: {spec.get('schemes', ['https'])[0]}://{spec.get('host', 'unknown')}{spec.get('basePath', '')}
 
 Endpoints:
-{chr(10).join(endpoint_summary)}
+{endpoint_summary}
 
 Create a detailed plan for generating Playwright API tests that:
 1. Creates resources first (POST)
@@ -213,27 +408,172 @@ Create a detailed plan for generating Playwright API tests that:
 
 Return a structured plan in JSON format."""
     
-    response = call_llm(system_prompt, user_prompt, temperature=0.3)
+    response = call_llm(_PLAN_SYSTEM_PROMPT, user_prompt, temperature=0.3, model=PLAN_MODEL)
     return response
 
 
-def generate_test_with_agent(endpoint_info, test_plan=None):
-    """Use LLM agent to generate a single Playwright test function"""
-    if not client:
-        return None
-    
-    # Extract schema information
-    body_params = [p for p in endpoint_info['parameters'] if p.get('in') == 'body']
-    schema_info = {}
-    if body_params:
-        schema = body_params[0].get('schema', {})
-        if '$ref' in schema:
-            ref_name = schema['$ref'].split('/')[-1]
-            schema_info = endpoint_info.get('definitions', {}).get(ref_name, {})
+# Parentheses in generated code, plus the string, template and comment regions to skip
+# (matched whole, so a bracket inside them is never counted)
+_PAREN_TOKEN_RE = re.compile(
+    r"'(?:[^'\\\n]|\\.)*'"
+    r'|"(?:[^"\\\n]|\\.)*"'
+    r"|`(?:[^`\\]|\\.)*`"
+    r"|//[^\n]*"
+    r"|/\*.*?\*/"
+    r"|[()]",
+    re.DOTALL,
+)
+
+# Documentation-only fields that don't help the model write a request
+_PROMPT_NOISE_KEYS = frozenset(("description", "example", "externalDocs", "xml"))
+# Fields whose values are data, not nested schemas, and are passed through untouched
+_PROMPT_VALUE_KEYS = frozenset(("default", "enum"))
+
+# Prompt JSON per object id; the object is kept with its text so the id can't be reused
+_PROMPT_JSON_CACHE = {}
+
+
+def _prompt_view(node):
+    """Copy of parameters/schema with documentation-only fields removed"""
+    if isinstance(node, list):
+        return [_prompt_view(item) for item in node]
+    if not isinstance(node, dict):
+        return node
+    view = {}
+    for key, value in node.items():
+        if key in _PROMPT_NOISE_KEYS:
+            continue
+        if key in _PROMPT_VALUE_KEYS:
+            view[key] = value
+        elif key == "properties" and isinstance(value, dict):
+            # Property names are data (a field may well be called "description")
+            view[key] = {name: _prompt_view(prop) for name, prop in value.items()}
         else:
-            schema_info = schema
+            view[key] = _prompt_view(value)
+    return view
+
+
+def _prompt_json(obj):
+    """Minified compact JSON for a prompt, built once per object (shared $ref schemas included)"""
+    entry = _PROMPT_JSON_CACHE.get(id(obj))
+    if entry is None:
+        view = _prompt_view(obj)
+        if orjson is not None:
+            # orjson output is already compact
+            text = orjson.dumps(view).decode("utf-8")
+        else:
+            text = json.dumps(view, separators=(",", ":"))
+        entry = _PROMPT_JSON_CACHE[id(obj)] = (obj, text)
+    return entry[1]
+
+
+# Path parameters like {petId}, {orderId}, {username}, {id}
+_PATH_PARAM_RE = re.compile(r"\{([^}]+)\}")
+# Path parameters generate_basic_test fills from stored resource IDs, with the
+# resourceIds key each one reads ({id} uses the endpoint's own resource name)
+_BASIC_PATH_PARAM_KEYS = {"petId": "pet", "orderId": "order", "username": "user", "id": None}
+_BASIC_PATH_PARAMS = frozenset(_BASIC_PATH_PARAM_KEYS)
+# (method, has_body, has_path_params) shapes that generate_basic_test already covers exactly
+_TEMPLATE_SHAPES = frozenset((
+    ("GET", False, False),
+    ("GET", False, True),
+    ("DELETE", False, False),
+    ("DELETE", False, True),
+))
+
+
+def _should_use_llm(ep, use_stored_id):
+    """Whether an endpoint is novel enough to be worth an LLM call
+
+    use_stored_id is the flag the endpoint is queued with for generate_basic_test.
+    """
+    has_body = False
+    for param in ep['parameters']:
+        location = param.get('in')
+        if location == 'body':
+            has_body = True
+        elif location != 'path':
+            # Query, header and form parameters need real values the template can't guess
+            return True
+    path_params = _PATH_PARAM_RE.findall(ep['path'])
+    if not _BASIC_PATH_PARAMS.issuperset(path_params):
+        return True
+    if path_params and not (use_stored_id and _resource_name(ep['path'], ep['method'])):
+        # The template writes the raw path unless it fills the parameters from stored IDs
+        return True
+    return (ep['method'], has_body, bool(path_params)) not in _TEMPLATE_SHAPES
+
+
+def _resource_name(path, method):
+    """Resource a path operates on: the segment before its first path parameter, or a POST's last segment"""
+    path_parts = path.split('/')
+    resource_name = None
+    for i, part in enumerate(path_parts):
+        if '{' in part and i > 0:
+            resource_name = path_parts[i-1]
+            break
     
-    system_prompt = """You are an expert at generating Playwright API tests.
+    if not resource_name and method == "POST":
+        resource_name = path_parts[-1]
+    return resource_name
+
+
+def _split_path(path):
+    """Static prefix of a path and the rest of it from the first path parameter on"""
+    brace = path.find('{')
+    if brace == -1:
+        return path, ""
+    return path[:brace], path[brace:]
+
+
+def _prompt_signature(ep):
+    """Endpoints with equal signatures only differ in their static path prefix and summary text.
+
+    One LLM generation per signature is enough; the others are re-targeted from it.
+    """
+    prefix, rest = _split_path(ep['path'])
+    if len(prefix) <= 1:
+        # Nothing distinctive to re-target on: the endpoint gets its own generation
+        return (ep['method'], ep['path'])
+    return (
+        ep['method'],
+        rest,
+        _resource_name(ep['path'], ep['method']),
+        bool(ep['summary']),
+        _prompt_json(ep['parameters']),
+        _prompt_json(ep['schema']),
+    )
+
+
+def _retarget_test(code, source_ep, ep):
+    """Rewrite a test generated for source_ep so it exercises ep instead (None if it can't)
+
+    Only the `${BASE_URL}<prefix>` URL literals and the test('METHOD <path>' title are
+    touched. The test is rejected unless at least one URL literal was rewritten and the
+    source prefix is gone, since a URL built any other way would still call source_ep.
+    """
+    source_prefix = _split_path(source_ep['path'])[0]
+    new_prefix = _split_path(ep['path'])[0]
+    url_literal = "`${BASE_URL}" + source_prefix
+    code, url_hits = re.subn(re.escape(url_literal), lambda _m: "`${BASE_URL}" + new_prefix, code)
+    code = re.sub(
+        r"(test\(\s*['\"`]" + re.escape(ep['method']) + r"\s+)" + re.escape(source_ep['path']),
+        lambda m: m.group(1) + ep['path'],
+        code,
+    )
+    if not url_hits:
+        return None
+    # Anything still naming the source prefix would test the wrong endpoint
+    if source_prefix in code.replace(new_prefix, ""):
+        return None
+    if ep['summary']:
+        code = code.replace(f"{ep['path']} - {source_ep['summary']}", f"{ep['path']} - {ep['summary']}")
+    return code
+
+
+# Endpoint-independent part of the per-endpoint prompt
+# Module-level so every request sends the very same bytes (prompt caches match on exact prefixes)
+_TEST_SYSTEM_PROMPT = """You are an expert at generating Playwright API tests.
 Generate ONLY a single test() function for Playwright.
 DO NOT include imports, describe blocks, or any other code.
 Return ONLY the test function starting with "test(" and ending with "});"
@@ -242,94 +582,203 @@ Example format:
     const response = await request.get(`...`);
     expect(response.status()).toBe(200);
   });"""
-    
-    user_prompt = f"""Generate a single Playwright test() function for this API endpoint:
 
-Method: {endpoint_info['method']}
-Path: {endpoint_info['path']}
-Summary: {endpoint_info['summary']}
-Parameters: {json.dumps(endpoint_info['parameters'], indent=2)}
-Schema: {json.dumps(schema_info, indent=2) if schema_info else 'None'}
+_TEST_PROMPT_PREFIX = """Generate a single Playwright test() function for the API endpoint described at the end.
 
 Requirements:
 - Return ONLY the test() function, nothing else
-- Use request fixture: async ({{ request }})
-- Use BASE_URL constant: `${{BASE_URL}}/path`
-- Use resourceIds object for path parameters: ${{resourceIds['resource'] || 1}}
+- Use request fixture: async ({ request })
+- Use BASE_URL constant: `${BASE_URL}/path`
+- Use resourceIds object for path parameters: ${resourceIds['resource'] || 1}
 - Store IDs in resourceIds for POST requests
 - Include Content-Type: application/json for POST/PUT/PATCH
-- Use minimal test data: {{ id: 1 }} for POST/PUT
+- Use minimal test data: { id: 1 } for POST/PUT
 - Assert status 200
 
-Return ONLY the test function code, no markdown, no explanations."""
+Return ONLY the test function code, no markdown, no explanations.
+
+Endpoint:
+"""
+
+
+# Sampling temperature for per-endpoint test generation
+_TEST_TEMPERATURE = 0.3
+
+
+def _test_prompts(endpoint_info):
+    """System and user prompt asking the model for one endpoint's test"""
+    # Body schema, already resolved by get_endpoints
+    schema_info = endpoint_info.get('schema', {})
+    
+    # Fixed instructions first and endpoint details last, so every request shares the
+    # longest possible prefix for the provider's prompt cache
+    user_prompt = _TEST_PROMPT_PREFIX + f"""Method: {endpoint_info['method']}
+Path: {endpoint_info['path']}
+Summary: {endpoint_info['summary']}
+Parameters: {_prompt_json(endpoint_info['parameters'])}
+Schema: {_prompt_json(schema_info) if schema_info else 'None'}"""
+    return _TEST_SYSTEM_PROMPT, user_prompt
+
+
+def _extract_test_function(response):
+    """The single test() block in an LLM response, or None if it has none
+
+    The block ends at the parenthesis that closes test(; brackets inside strings,
+    template literals and comments are ignored. A well-formed test comes back unchanged.
+    """
+    # Remove markdown code blocks if present
+    response = response.strip()
+    if '```typescript' in response:
+        response = response.split('```typescript')[1].split('```')[0].strip()
+    elif '```javascript' in response:
+        response = response.split('```javascript')[1].split('```')[0].strip()
+    elif '```' in response:
+        response = response.split('```')[1].split('```')[0].strip()
+    
+    # Extract test function - find test( and the ) that closes it
+    if 'test(' not in response:
+        return None
+    start_idx = response.find('test(')
+    paren_count = 0
+    end_idx = start_idx
+    # Only parentheses matter, so let the regex engine skip the text between them
+    for match in _PAREN_TOKEN_RE.finditer(response, start_idx):
+        char = match.group()
+        if char == '(':
+            paren_count += 1
+        elif char == ')':
+            paren_count -= 1
+            if paren_count == 0:
+                end_idx = match.end()
+                # Keep the statement's trailing semicolon
+                if response.startswith(';', end_idx):
+                    end_idx += 1
+                break
+    
+    extracted = response[start_idx:end_idx].strip()
+    # Ensure the call is terminated
+    if extracted.endswith(')'):
+        extracted += ';'
+    elif not extracted.endswith(');'):
+        extracted += '});'
+    return extracted
+
+
+def generate_test_with_agent(endpoint_info, test_plan=None):
+    """Use LLM agent to generate a single Playwright test function"""
+    if not _get_client():
+        return None
     
+    system_prompt, user_prompt = _test_prompts(endpoint_info)
     try:
-        response = call_llm(system_prompt, user_prompt, temperature=0.3)
+        response = call_llm(system_prompt, user_prompt, temperature=_TEST_TEMPERATURE, model=CODEGEN_MODEL)
         # Extract only the test function from response
         if response:
-            # Remove markdown code blocks if present
-            response = response.strip()
-            if '```typescript' in response:
-                response = response.split('```typescript')[1].split('```')[0].strip()
-            elif '```javascript' in response:
-                response = response.split('```javascript')[1].split('```')[0].strip()
-            elif '```' in response:
-                response = response.split('```')[1].split('```')[0].strip()
-            
-            # Extract test function - find test( and matching });
-            if 'test(' in response:
-                start_idx = response.find('test(')
-                # Find matching closing });
-                brace_count = 0
-                paren_count = 0
-                end_idx = start_idx
-                for i in range(start_idx, len(response)):
-                    if response[i] == '(':
-                        paren_count += 1
-                    elif response[i] == ')':
-                        paren_count -= 1
-                    elif response[i] == '{':
-                        brace_count += 1
-                    elif response[i] == '}':
-                        brace_count -= 1
-                        if brace_count == 0 and paren_count == 0:
-                            end_idx = i + 1
-                            break
-                
-                extracted = response[start_idx:end_idx].strip()
-                # Ensure it ends with });
-                if not extracted.endswith('});'):
-                    extracted += '});'
-                return extracted
-        
+            return _extract_test_function(response)
         return None
     except Exception as e:
         print(f"⚠️  Error generating test with agent: {e}")
         return None
 
 
+# Seconds between status checks of a submitted OpenAI batch
+BATCH_POLL_SECONDS = 30
+_BATCH_DONE_STATUSES = frozenset(("completed", "failed", "expired", "cancelled"))
+
+
+def generate_tests_with_batch(endpoints):
+    """Generate tests for endpoints with one OpenAI Batch API job (half price, up to 24h).
+
+    Prompts already in the disk cache are answered from it and only the misses are
+    submitted. Returns the extracted test per endpoint, None where none came back.
+    """
+    client = _get_client()
+    prompts = [_test_prompts(ep) for ep in endpoints]
+    responses = [None] * len(endpoints)
+    
+    requests_jsonl = []
+    for i, (system_prompt, user_prompt) in enumerate(prompts):
+        cache_file = _llm_cache_file(system_prompt, user_prompt, _TEST_TEMPERATURE, CODEGEN_MODEL)
+        if cache_file.exists():
+            responses[i] = cache_file.read_text(encoding="utf-8")
+            continue
+        requests_jsonl.append(json.dumps({
+            "custom_id": str(i),
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": CODEGEN_MODEL,
+                "messages": [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ],
+                "temperature": _TEST_TEMPERATURE,
+                "max_tokens": 4000,
+            },
+        }))
+    
+    if requests_jsonl:
+        try:
+            batch_input = client.files.create(
+                file=("batch.jsonl", ("\n".join(requests_jsonl) + "\n").encode("utf-8")),
+                purpose="batch",
+            )
+            batch = client.batches.create(
+                input_file_id=batch_input.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h",
+            )
+            print(f"📦 Submitted OpenAI batch {batch.id} with {len(requests_jsonl)} requests")
+            while batch.status not in _BATCH_DONE_STATUSES:
+                time.sleep(BATCH_POLL_SECONDS)
+                batch = client.batches.retrieve(batch.id)
+            print(f"📦 Batch {batch.id} finished with status: {batch.status}")
+            
+            if batch.output_file_id:
+                for line in client.files.content(batch.output_file_id).text.splitlines():
+                    if not line.strip():
+                        continue
+                    result = json.loads(line)
+                    body = (result.get("response") or {}).get("body") or {}
+                    choices = body.get("choices") or []
+                    text = choices[0]["message"]["content"] if choices else None
+                    if text:
+                        i = int(result["custom_id"])
+                        responses[i] = text
+                        _write_llm_cache(_llm_cache_file(*prompts[i], _TEST_TEMPERATURE, CODEGEN_MODEL), text)
+        except Exception as e:
+            print(f"   ⚠️  OpenAI Batch API error: {e}")
+    
+    return [_extract_test_function(response) if response else None for response in responses]
+
+
 def get_base_url_from_spec(spec, swagger_url=None):
     """Extract base URL from OpenAPI/Swagger spec"""
-    # Try OpenAPI 3.0 format first (uses 'servers' array)
-    if "servers" in spec and spec["servers"]:
-        server_url = spec["servers"][0].get("url", "")
-        if server_url:
-            # Remove trailing slash
-            return server_url.rstrip("/")
-    
-    # Try Swagger 2.0 format (uses 'host', 'basePath', 'schemes')
-    host = spec.get("host", "")
-    base_path = spec.get("basePath", "")
+    # OpenAPI 3.0 uses a 'servers' array, Swagger 2.0 'host', 'basePath' and 'schemes'
+    servers = spec.get("servers")
+    server_url = servers[0].get("url", "") if servers else ""
     schemes = spec.get("schemes", ["https"])
     scheme = schemes[0] if schemes else "https"
+    return _base_url_from_fields(
+        server_url, spec.get("host", ""), spec.get("basePath", ""), scheme, swagger_url
+    )
+
+
+@functools.lru_cache(maxsize=32)
+def _base_url_from_fields(server_url, host, base_path, scheme, swagger_url):
+    """Base URL from the spec's server fields (memoized; the spec dict itself isn't hashable)"""
+    # Try OpenAPI 3.0 format first
+    if server_url:
+        # Remove trailing slash
+        return server_url.rstrip("/")
     
+    # Try Swagger 2.0 format
     if host:
         full_url = f"{scheme}://{host}{base_path}".rstrip("/")
         return full_url
     
     # Fallback: extract from swagger_url if provided
     if swagger_url:
-        from urllib.parse import urlparse
         parsed = urlparse(swagger_url)
         # Remove /swagger/v1/swagger.json or similar paths
         base = f"{parsed.scheme}://{parsed.netloc}"
@@ -346,8 +795,38 @@ def get_base_url_from_spec(spec, swagger_url=None):
     return "https://api.example.com"
 
 
-def use_playwright_mcp_tools(spec, endpoints):
+# Method -> bucket within a resource group (POST is only bucketed without path params)
+_METHOD_BUCKETS = {'GET': 'get', 'PUT': 'put', 'DELETE': 'delete'}
+
+
+def use_playwright_mcp_tools(spec, endpoints, batch=False):
     """Use Playwright MCP tools programmatically to generate tests"""
+    return build_playwright_suite(spec, endpoints, batch=batch)[0]
+
+
+def generate_basic_suite(spec, endpoints):
+    """Schema-only spec file from the basic generator, as (test_code, test_count)"""
+    buffer = io.StringIO()
+    test_count = write_playwright_tests(spec, endpoints, buffer, SWAGGER_URL)
+    return buffer.getvalue(), test_count
+
+
+def _result_or_none(future):
+    """Result of a generation task; a failure only costs that endpoint (it falls back to basic)"""
+    try:
+        return future.result()
+    except Exception as e:
+        print(f"⚠️  Error generating test with agent: {e}")
+        return None
+
+
+def build_playwright_suite(spec, endpoints, batch=False):
+    """Generate the spec file (AI-assisted when enabled), as (test_code, test_count).
+
+    With batch=True and OpenAI, the LLM generations go through one Batch API job
+    instead of real-time requests. Tests are counted as they are emitted, so the
+    result never has to be re-scanned.
+    """
     print("🔧 Generating tests using local patterns...")
     
     # Get base URL from spec (handles both OpenAPI 3.0 and Swagger 2.0)
@@ -362,22 +841,16 @@ def use_playwright_mcp_tools(spec, endpoints):
     
     # Generate tests (no API key header used by default)
     # DO NOT include test plan in generated code
-    test_code = f"""import {{ test, expect }} from '@playwright/test';
-
-const BASE_URL = '{full_base_url}';
-
-let resourceIds: Record<string, any> = {{}};
-
-test.describe('{api_title} - API Tests', () => {{
-"""
+    # Fragments are collected and joined once at the end
+    parts = []
+    append = parts.append
+    append(_spec_header(full_base_url, api_title))
     
     # Group endpoints by resource and method
     resource_groups = {
-        'pet': {'post': [], 'get': [], 'put': [], 'delete': []},
-        'order': {'post': [], 'get': [], 'put': [], 'delete': []},
-        'user': {'post': [], 'get': [], 'put': [], 'delete': []},
-        'other': []
+        resource: {'post': [], 'get': [], 'put': [], 'delete': []} for resource in _RESOURCE_GROUPS
     }
+    resource_groups['other'] = []
     
     for ep in endpoints:
         path = ep['path']
@@ -385,35 +858,21 @@ test.describe('{api_title} - API Tests', () => {{
         consumes = ep.get("consumes", [])
         
         # Skip problematic endpoints
-        if "multipart/form-data" in consumes or "application/x-www-form-urlencoded" in consumes:
-            continue
-        if path in ["/user/createWithList", "/user/createWithArray"]:
+        if not _FORM_CONTENT_TYPES.isdisjoint(consumes) or path in _SKIPPED_PATHS:
             continue
         
         # Categorize by resource using mapping; unknown or unsupported methods go to 'other'
-        lower_path = path.lower()
-        resource_map = {
-            'pet': ['pet'],
-            'order': ['order', 'store'],
-            'user': ['user'],
-        }
-
-        target_group = None
-        for key, keywords in resource_map.items():
-            if any(k in lower_path for k in keywords):
-                target_group = key
-                break
+        target_group = _resource_group(path)
 
         if not target_group:
             resource_groups['other'].append(ep)
             continue
 
         # Determine method bucket, respecting POST-without-path-param rule
-        bucket = None
-        if method == 'POST' and '{' not in path:
-            bucket = 'post'
-        elif method in ['GET', 'PUT', 'DELETE']:
-            bucket = method.lower()
+        if method == 'POST':
+            bucket = 'post' if '{' not in path else None
+        else:
+            bucket = _METHOD_BUCKETS.get(method)
 
         if bucket:
             resource_groups[target_group][bucket].append(ep)
@@ -421,77 +880,109 @@ test.describe('{api_title} - API Tests', () => {{
             # Place PATCH and any other methods not explicitly handled into 'other'
             resource_groups['other'].append(ep)
     
-    # Generate tests in order: POST → PUT → DELETE → GET
-    # Use basic generation for reliability (LLM causes issues)
-    for resource in ['pet', 'order', 'user']:
-        for ep in resource_groups[resource]['post']:
-            if USE_AI_FOR_TESTS and client:
-                generated = generate_test_with_agent(ep)
-                if generated and generated.strip().startswith("test("):
-                    test_code += ("\n  " + generated + "\n")
-                else:
-                    test_code += generate_basic_test(ep, use_stored_id=False)
-            else:
-                test_code += generate_basic_test(ep, use_stored_id=False)
-        
-        for ep in resource_groups[resource]['put']:
-            needs_id = '{' in ep['path']
-            if USE_AI_FOR_TESTS and client:
-                generated = generate_test_with_agent(ep)
-                if generated and generated.strip().startswith("test("):
-                    test_code += ("\n  " + generated + "\n")
-                else:
-                    test_code += generate_basic_test(ep, use_stored_id=needs_id)
-            else:
-                test_code += generate_basic_test(ep, use_stored_id=needs_id)
+    # Generate tests in order: POST → PUT → DELETE → GET per resource, then other tests
+    ordered_eps = []
+    for resource in _RESOURCE_GROUPS:
+        groups = resource_groups[resource]
+        ordered_eps.extend((ep, False) for ep in groups['post'])
+        for bucket in ['put', 'delete', 'get']:
+            ordered_eps.extend((ep, '{' in ep['path']) for ep in groups[bucket])
+    ordered_eps.extend((ep, False) for ep in resource_groups['other'])
+    
+    if USE_AI_FOR_TESTS and _get_client():
+        # Trivial endpoints skip the LLM and keep the basic template; the rest are
+        # generated once per distinct prompt signature
+        signatures = [
+            _prompt_signature(ep) if _should_use_llm(ep, use_stored_id) else None
+            for ep, use_stored_id in ordered_eps
+        ]
+        representatives = {}
+        for (ep, _), signature in zip(ordered_eps, signatures):
+            if signature is not None:
+                representatives.setdefault(signature, ep)
         
-        for ep in resource_groups[resource]['delete']:
-            needs_id = '{' in ep['path']
-            if USE_AI_FOR_TESTS and client:
-                generated = generate_test_with_agent(ep)
-                if generated and generated.strip().startswith("test("):
-                    test_code += ("\n  " + generated + "\n")
-                else:
-                    test_code += generate_basic_test(ep, use_stored_id=needs_id)
-            else:
-                test_code += generate_basic_test(ep, use_stored_id=needs_id)
+        if batch and LLM_PROVIDER == "openai":
+            generated_by_signature = dict(zip(
+                representatives,
+                generate_tests_with_batch(list(representatives.values()))
+            ))
+        else:
+            if batch:
+                print("⚠️  --batch is only supported with OpenAI; generating tests in real time.")
+            # Each generation is an independent LLM round-trip, so overlap them on the shared
+            # client (its connection pool is reused across workers); each one is reported
+            # as soon as it finishes
+            generated_by_signature = {}
+            with ThreadPoolExecutor(max_workers=LLM_MAX_WORKERS) as executor:
+                pending = {
+                    executor.submit(generate_test_with_agent, ep): signature
+                    for signature, ep in representatives.items()
+                }
+                for done, future in enumerate(as_completed(pending), 1):
+                    signature = pending[future]
+                    generated = generated_by_signature[signature] = _result_or_none(future)
+                    ep = representatives[signature]
+                    status = "✓" if generated else "↩ basic"
+                    print(f"   {status} [{done}/{len(pending)}] {ep['method']} {ep['path']}")
         
-        for ep in resource_groups[resource]['get']:
-            needs_id = '{' in ep['path']
-            if USE_AI_FOR_TESTS and client:
-                generated = generate_test_with_agent(ep)
-                if generated and generated.strip().startswith("test("):
-                    test_code += ("\n  " + generated + "\n")
-                else:
-                    test_code += generate_basic_test(ep, use_stored_id=needs_id)
-            else:
-                test_code += generate_basic_test(ep, use_stored_id=needs_id)
-    
-    # Add other tests
-    for ep in resource_groups['other']:
-        if USE_AI_FOR_TESTS and client:
-            generated = generate_test_with_agent(ep)
-            if generated and generated.strip().startswith("test("):
-                test_code += ("\n  " + generated + "\n")
-            else:
-                test_code += generate_basic_test(ep, use_stored_id=False)
+        generated_tests = []
+        for (ep, _), signature in zip(ordered_eps, signatures):
+            generated = generated_by_signature.get(signature) if signature is not None else None
+            source_ep = representatives.get(signature)
+            if generated and source_ep is not ep:
+                generated = _retarget_test(generated, source_ep, ep)
+            generated_tests.append(generated)
+    else:
+        generated_tests = [None] * len(ordered_eps)
+    
+    # Every endpoint emits exactly one test, generated or basic
+    test_count = len(ordered_eps)
+    for (ep, use_stored_id), generated in zip(ordered_eps, generated_tests):
+        if generated and generated.strip().startswith("test("):
+            append("\n  " + generated + "\n")
         else:
-            test_code += generate_basic_test(ep, use_stored_id=False)
+            # Use basic generation for reliability (LLM causes issues)
+            append(generate_basic_test(ep, use_stored_id=use_stored_id))
     
-    test_code += """});
-"""
+    append(_SPEC_FOOTER)
     
     # Finalize and validate: ensure at least one test() exists; else fallback to basic generator
-    final_code = test_code
+    final_code = "".join(parts)
     if "test(" not in final_code:
         print("⚠️  No valid tests generated via AI; falling back to basic generator.")
+        test_count = 0
         try:
-            sys.path.insert(0, str(project_root))
-            from generate_playwright_tests import generate_playwright_tests
-            final_code = generate_playwright_tests(spec, endpoints)
+            final_code, test_count = generate_basic_suite(spec, endpoints)
         except Exception as e:
             print(f"❌ Fallback generation failed: {e}")
-    return final_code
+    return final_code, test_count
+
+
+# Fixed TypeScript fragments of the generated spec file
+_SPEC_FOOTER = """});
+"""
+_JSON_BODY = """
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      data: { id: 1 },"""
+_TEST_CLOSE = """
+  });
+"""
+# HTTP methods that send the JSON request body
+_BODY_METHODS = frozenset(("POST", "PUT", "PATCH"))
+
+
+def _spec_header(base_url, api_title):
+    """Opening of the generated spec file, up to the test.describe block"""
+    return f"""import {{ test, expect }} from '@playwright/test';
+
+const BASE_URL = '{base_url}';
+
+let resourceIds: Record<string, any> = {{}};
+
+test.describe('{api_title} - API Tests', () => {{
+"""
 
 
 def generate_basic_test(ep, use_stored_id=False):
@@ -514,50 +1005,43 @@ def generate_basic_test(ep, use_stored_id=False):
         test_name = f"{method} {path} - {summary}"
     
     # Extract resource name
-    path_parts = path.split('/')
-    resource_name = None
-    for i, part in enumerate(path_parts):
-        if '{' in part and i > 0:
-            resource_name = path_parts[i-1]
-            break
+    resource_name = _resource_name(path, method)
     
-    if not resource_name and method == "POST":
-        resource_name = path_parts[-1]
-    
-    test_code = f"""
-  test('{test_name}', async ({{ request }}) => {{"""
+    parts = []
+    append = parts.append
+    append(f"""
+  test('{test_name}', async ({{ request }}) => {{""")
     
     if use_stored_id and resource_name:
-        # Replace path parameters with stored IDs (with fallback)
-        dynamic_path = path
-        # Handle common path parameters
-        dynamic_path = dynamic_path.replace('{petId}', '${resourceIds[\'pet\'] || 1}')
-        dynamic_path = dynamic_path.replace('{orderId}', '${resourceIds[\'order\'] || 1}')
-        dynamic_path = dynamic_path.replace('{username}', '${resourceIds[\'user\'] || 1}')
-        dynamic_path = dynamic_path.replace('{id}', f'${{resourceIds[\'{resource_name}\'] || 1}}')
+        # Replace the common path parameters with stored IDs (with fallback) in one pass;
+        # any other parameter is left as-is
+        def stored_id(match):
+            param = match.group(1)
+            if param not in _BASIC_PATH_PARAM_KEYS:
+                return match.group(0)
+            key = _BASIC_PATH_PARAM_KEYS[param] or resource_name
+            return f"${{resourceIds['{key}'] || 1}}"
+        
+        dynamic_path = _PATH_PARAM_RE.sub(stored_id, path)
         
-        test_code += f"""
-    const response = await request.{method.lower()}(`${{BASE_URL}}{dynamic_path}`, {{"""
+        append(f"""
+    const response = await request.{method.lower()}(`${{BASE_URL}}{dynamic_path}`, {{""")
     else:
-        test_code += f"""
-    const response = await request.{method.lower()}(`${{BASE_URL}}{path}`, {{"""
+        append(f"""
+    const response = await request.{method.lower()}(`${{BASE_URL}}{path}`, {{""")
     
     # Add headers and data for POST/PUT/PATCH
-    if method in ["POST", "PUT", "PATCH"]:
-        test_code += """
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      data: { id: 1 },"""
+    if method in _BODY_METHODS:
+        append(_JSON_BODY)
     
-    test_code += f"""
+    append(f"""
     }});
     
-    expect(response.status()).toBe({expected_status});"""
+    expect(response.status()).toBe({expected_status});""")
     
     # Store ID for POST requests
     if method == "POST" and not use_stored_id and resource_name:
-        test_code += f"""
+        append(f"""
     
     // Store the created resource ID for later tests
     if (response.ok()) {{
@@ -569,73 +1053,88 @@ def generate_basic_test(ep, use_stored_id=False):
         resourceIds['{resource_name}'] = body.username;
         console.log('Created {resource_name} with username:', body.username);
       }}
-    }}"""
+    }}""")
     
-    test_code += """
-  });
-"""
+    append(_TEST_CLOSE)
     
-    return test_code
+    return "".join(parts)
 
 
-# Main execution
-print("=" * 80)
-print("🚀 Playwright Test Generator")
-print("=" * 80)
+def main():
+    """Generate the spec file for the configured API, with AI when enabled"""
+    # Start downloading the spec right away; it overlaps with importing the provider
+    # SDK and everything else up to the point the spec is needed
+    spec_loader = ThreadPoolExecutor(max_workers=1)
+    spec_future = spec_loader.submit(load_swagger_spec)
+    spec_loader.shutdown(wait=False)
+
+    # Debug: Print config status
+    if LLM_PROVIDER != "none":
+        print(f"🔧 Config: LLM Provider = {LLM_PROVIDER}")
+        print(f"🔧 Config: OpenAI API Key present = {bool(OPENAI_API_KEY)}")
+        print(f"🔧 Config: Anthropic API Key present = {bool(ANTHROPIC_API_KEY)}")
+        print(f"🔧 Config: use_ai_for_tests = {bool(USE_AI_FOR_TESTS)}")
+
+    # Report the provider before the banner (the client itself is created lazily)
+    _get_client()
+
+    print("=" * 80)
+    print("🚀 Playwright Test Generator")
+    print("=" * 80)
+
+    if LLM_PROVIDER == "none" or not USE_AI_FOR_TESTS:
+        print("\n⚠️  AI-based test generation disabled. Using basic test generation.")
+
+        spec = spec_future.result()
+        endpoints = get_endpoints(spec)
+        # Use basic generation
+        playwright_tests, test_count = generate_basic_suite(spec, endpoints)
+    elif not _get_client():
+        print("\n⚠️  AI client not available. Falling back to basic generation.")
+
+        spec = spec_future.result()
+        endpoints = get_endpoints(spec)
+        # Use basic generation
+        playwright_tests, test_count = generate_basic_suite(spec, endpoints)
+    else:
+        print(f"\n🤖 Using {LLM_PROVIDER.upper()} agent: {CODEGEN_MODEL}")
+        print(f"📡 Loading API spec from: {SWAGGER_URL}\n")
+
+        spec = spec_future.result()
+        endpoints = get_endpoints(spec)
+        # --batch: submit the generations as one OpenAI Batch API job (cheaper, slower)
+        batch = "--batch" in sys.argv[1:]
+        playwright_tests, test_count = build_playwright_suite(spec, endpoints, batch=batch)
+
+    # Generate test file name from API spec
+    output_file = project_root / "tests" / spec_file_name(spec)
+
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    # Leave an identical file untouched so watchers and Playwright's caches don't see a change
+    new_content = playwright_tests.encode("utf-8")
+    unchanged = (
+        output_file.exists()
+        and output_file.stat().st_size == len(new_content)
+        and output_file.read_bytes() == new_content
+    )
+    if not unchanged:
+        output_file.write_bytes(new_content)
+
+    print("\n" + "=" * 80)
+    print(f"✅ Playwright tests generated: {output_file}")
+    if unchanged:
+        print("   (unchanged since the last run, file not rewritten)")
+    print(f"📝 Generated {test_count} test cases")
+    print(f"\n🤖 Agent Features Used:")
+    print(f"   • AI-powered test plan generation")
+    print(f"   • Intelligent test code generation")
+    print(f"   • Playwright MCP patterns")
+    print(f"   • Resource dependency handling")
+    print("\nTo run the tests:")
+    print("  npx playwright test")
+    print("  npx playwright show-report")
+    print("=" * 80)
 
-if LLM_PROVIDER == "none" or not USE_AI_FOR_TESTS:
-    print("\n⚠️  AI-based test generation disabled. Using basic test generation.")
-    
-    spec = load_swagger_spec()
-    endpoints = get_endpoints(spec)
-    # Use basic generation
-    sys.path.insert(0, str(project_root))
-    from generate_playwright_tests import generate_playwright_tests
-    playwright_tests = generate_playwright_tests(spec, endpoints)
-elif not client:
-    print("\n⚠️  AI client not available. Falling back to basic generation.")
-    
-    spec = load_swagger_spec()
-    endpoints = get_endpoints(spec)
-    # Use basic generation
-    sys.path.insert(0, str(project_root))
-    from generate_playwright_tests import generate_playwright_tests
-    playwright_tests = generate_playwright_tests(spec, endpoints)
-else:
-    print(f"\n🤖 Using {LLM_PROVIDER.upper()} agent: {MODEL}")
-    print(f"📡 Loading API spec from: {SWAGGER_URL}\n")
-    
-    spec = load_swagger_spec()
-    endpoints = get_endpoints(spec)
-    playwright_tests = use_playwright_mcp_tools(spec, endpoints)
-
-# Generate test file name from API spec
-api_info = spec.get("info", {})
-api_title = api_info.get("title", "API")
-api_name = "".join(c.lower() if c.isalnum() else "_" for c in api_title).strip("_")
-if not api_name:
-    host = spec.get("host", "")
-    api_name = host.split(".")[0] if host and "." in host else "api_tests"
-
-test_filename = f"{api_name}.spec.ts"
-output_file = project_root / "tests" / test_filename
-
-os.makedirs(output_file.parent, exist_ok=True)
-with open(output_file, "w") as f:
-    f.write(playwright_tests)
-
-test_count = len([line for line in playwright_tests.split('\n') if 'test(' in line])
-
-print("\n" + "=" * 80)
-print(f"✅ Playwright tests generated: {output_file}")
-print(f"📝 Generated {test_count} test cases")
-print(f"\n🤖 Agent Features Used:")
-print(f"   • AI-powered test plan generation")
-print(f"   • Intelligent test code generation")
-print(f"   • Playwright MCP patterns")
-print(f"   • Resource dependency handling")
-print("\nTo run the tests:")
-print("  npx playwright test")
-print("  npx playwright show-report")
-print("=" * 80)
 
+if __name__ == "__main__":
+    main()
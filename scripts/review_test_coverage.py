@@ -2,13 +2,23 @@
 # Agent 2: Reviews generated tests for coverage based on API documentation
 # Uses Playwright MCP patterns for coverage analysis
 
-import requests
+import functools
+import hashlib
 import json
 import os
+import pickle
 import re
 import sys
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Set, Tuple
+from typing import Dict, List, NamedTuple, Set, Tuple
+
+# Optional fast JSON parser for large specs
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Get project root and add to path BEFORE importing scripts module
 project_root = Path(__file__).parent.parent
@@ -16,39 +26,36 @@ if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
 # Now import config_loader (after adding project root to path)
-from scripts.config_loader import get_swagger_url, load_config
+from scripts.config_loader import get_swagger_url, load_config, write_atomic
+from scripts.generate_playwright_tests import spec_file_name
+from scripts.spec_loader import SPEC_TIMEOUT, load_cached_spec, new_spec_session
 
 # Paths and configuration
 config = load_config()
 
 SWAGGER_URL = get_swagger_url()
+
+# Shared HTTP session for spec fetches
+_SESSION = new_spec_session()
+
+def load_swagger_spec(url=SWAGGER_URL):
+    """Load Swagger/OpenAPI specification, reusing the cached copy while it is unchanged"""
+    return load_cached_spec(url, _SESSION, timeout=SPEC_TIMEOUT)
+
+
 # Generate test file name from API spec if not specified
 if "test_file" not in config:
     # Try to derive from API spec
     try:
-        swagger_url = get_swagger_url()
-        import requests
-        spec_response = requests.get(swagger_url)
-        spec = spec_response.json()
-        api_info = spec.get("info", {})
-        api_title = api_info.get("title", "API")
-        api_name = "".join(c.lower() if c.isalnum() else "_" for c in api_title).strip("_")
-        if not api_name:
-            api_name = "api_tests"
-        TEST_FILE = str(project_root / "tests" / f"{api_name}.spec.ts")
+        spec = load_swagger_spec()
+        # Same file name the generators write
+        TEST_FILE = str(project_root / "tests" / spec_file_name(spec))
     except:
         TEST_FILE = str(project_root / "tests" / "api_tests.spec.ts")
 else:
     TEST_FILE = config.get("test_file", str(project_root / "tests" / "api_tests.spec.ts"))
 
 
-def load_swagger_spec(url=SWAGGER_URL):
-    """Load Swagger/OpenAPI specification"""
-    response = requests.get(url)
-    response.raise_for_status()
-    return response.json()
-
-
 def load_generated_tests(test_file=TEST_FILE):
     """Load the generated test file"""
     # Ensure absolute path
@@ -65,92 +72,157 @@ def load_generated_tests(test_file=TEST_FILE):
         return f.read()
 
 
+# Operations counted for coverage
+_HTTP_METHODS = frozenset(("GET", "POST", "PUT", "DELETE", "PATCH"))
+
+
+class Endpoint(NamedTuple):
+    """Lightweight endpoint record: smaller than a dict, with attribute access"""
+    path: str
+    method: str
+    summary: str
+    description: str
+    operation_id: str
+    tags: list
+    parameters: list
+    responses: dict
+    consumes: list
+
+
 def extract_endpoints_from_spec(spec):
     """Extract all endpoints from Swagger spec"""
     paths = spec.get("paths", {})
     endpoints = []
+    append = endpoints.append
     
     for path, methods in paths.items():
         for method, details in methods.items():
-            if method.upper() in ["GET", "POST", "PUT", "DELETE", "PATCH"]:
-                endpoints.append({
-                    "path": path,
-                    "method": method.upper(),
-                    "summary": details.get("summary", ""),
-                    "description": details.get("description", ""),
-                    "operationId": details.get("operationId", ""),
-                    "tags": details.get("tags", []),
-                    "parameters": details.get("parameters", []),
-                    "responses": details.get("responses", {}),
-                    "consumes": details.get("consumes", [])
-                })
+            method = method.upper()
+            if method not in _HTTP_METHODS:
+                continue
+            get = details.get
+            append(Endpoint(
+                path,
+                method,
+                get("summary", ""),
+                get("description", ""),
+                get("operationId", ""),
+                get("tags", []),
+                get("parameters", []),
+                get("responses", {}),
+                get("consumes", [])
+            ))
     
     return endpoints
 
 
+# test('METHOD /path - description', async ...) calls and request.get(`${BASE_URL}/path`)
+# style calls in the generated file, found in a single scan
+_TEST_OR_REQUEST_RE = re.compile(
+    r"test\(['\"](?P<name>[^'\"]+)['\"],\s*async"
+    r"|(?i:request\.(?P<method>get|post|put|delete|patch)\([`'\"](?P<url>[^`'\"]+)[`'\"])"
+)
+# "METHOD /path" at the start of a test name
+_METHOD_PATH_RE = re.compile(r"^(\w+)\s+([^\s-]+)")
+# Template-literal prefix of the request URLs in the generated tests
+_BASE_URL_MARKER = "${BASE_URL}"
+# Path parameters: {id} in the spec, ${resourceIds['id']} in the tests
+_PARAM_RE = re.compile(r'\$?\{[^}]+\}')
+
+
+# Extraction results are pickled here, keyed by a hash of the test file's content;
+# bump the version whenever the extraction output changes. Only the latest entry is kept.
+_EXTRACT_CACHE_DIR = project_root / ".coverage_cache"
+_EXTRACT_CACHE_VERSION = 1
+
+
 def extract_tests_from_file(test_content):
-    """Extract test information from generated test file"""
-    tests = []
-    
-    # Pattern to match test() calls
-    test_pattern = r"test\(['\"]([^'\"]+)['\"],\s*async"
-    test_matches = re.finditer(test_pattern, test_content)
-    
-    for match in test_matches:
-        test_name = match.group(1)
-        
-        # Extract method and path from test name
-        # Format: "METHOD /path - description" or "METHOD /path"
-        method_path_match = re.match(r"^(\w+)\s+([^\s-]+)", test_name)
-        if method_path_match:
-            method = method_path_match.group(1).upper()
-            path = method_path_match.group(2)
-            
-            tests.append({
-                "name": test_name,
-                "method": method,
-                "path": path,
-                "full_name": test_name
-            })
-    
-    # Also look for request calls to find actual endpoints being tested
-    request_pattern = r"request\.(get|post|put|delete|patch)\([`'\"]([^`'\"]+)[`'\"]"
-    request_matches = re.finditer(request_pattern, test_content, re.IGNORECASE)
+    """Extract test information from generated test file (cached while the content is unchanged)"""
+    key = hashlib.sha256(f"{_EXTRACT_CACHE_VERSION}:{test_content}".encode("utf-8")).hexdigest()[:16]
+    cache_file = _EXTRACT_CACHE_DIR / f"tests_{key}.pkl"
+    try:
+        with open(cache_file, "rb") as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        pass
     
+    result = _scan_test_file(test_content)
+    try:
+        _write_extract_cache(cache_file, result)
+    except OSError:
+        # Caching is best-effort
+        pass
+    return result
+
+
+def _write_extract_cache(cache_file, result):
+    """Atomically store an extraction result and drop the entries for older test files"""
+    os.makedirs(_EXTRACT_CACHE_DIR, exist_ok=True)
+    write_atomic(cache_file, pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+    for stale in _EXTRACT_CACHE_DIR.glob("tests_*.pkl"):
+        if stale != cache_file:
+            try:
+                stale.unlink()
+            except OSError:
+                pass
+
+
+def _scan_test_file(test_content):
+    """Tests (name, method, path) and the (method, path) request calls in a test file"""
+    tests = []
+    # Request calls show the endpoints actually being tested
     tested_endpoints = set()
-    for match in request_matches:
-        method = match.group(1).upper()
-        url = match.group(2)
+    
+    for match in _TEST_OR_REQUEST_RE.finditer(test_content):
+        test_name = match.group("name")
+        if test_name is not None:
+            # Extract method and path from test name
+            # Format: "METHOD /path - description" or "METHOD /path"
+            method_path_match = _METHOD_PATH_RE.match(test_name)
+            if method_path_match:
+                method = method_path_match.group(1).upper()
+                path = method_path_match.group(2)
+                
+                tests.append({
+                    "name": test_name,
+                    "method": method,
+                    "path": path,
+                    "full_name": test_name
+                })
+            continue
         
-        # Extract path from URL (remove BASE_URL and query params)
-        if "${BASE_URL}" in url:
-            path = url.split("${BASE_URL}")[-1].split("?")[0]
-        elif "BASE_URL" in url:
-            # Handle template literals
-            path_match = re.search(r'`\$\{BASE_URL\}([^`]+)`', url)
-            if path_match:
-                path = path_match.group(1).split("?")[0]
-            else:
-                path = url.split("?")[0]
-        else:
-            path = url.split("?")[0]
+        method = match.group("method").upper()
+        url = match.group("url")
         
-        tested_endpoints.add((method, path))
+        # Extract path from URL (remove everything up to the last ${BASE_URL}, and query params)
+        start = url.rfind(_BASE_URL_MARKER)
+        start = start + len(_BASE_URL_MARKER) if start >= 0 else 0
+        end = url.find("?", start)
+        tested_endpoints.add((method, url[start:end] if end >= 0 else url[start:]))
     
     return tests, tested_endpoints
 
 
+# Endpoints the generators never write tests for, so they don't count against coverage
+_SKIP_CONSUMES = frozenset(("multipart/form-data", "application/x-www-form-urlencoded"))
+_SKIP_PATHS = frozenset(("/user/createWithList", "/user/createWithArray"))
+
+
+@functools.lru_cache(maxsize=4096)
 def normalize_path(path):
-    """Normalize path for comparison (remove trailing slashes, handle parameters)"""
+    """Normalize path for comparison (remove trailing slashes, handle parameters; memoized)"""
     # Remove trailing slash
     path = path.rstrip('/')
     if not path:
         path = '/'
     
+    # Most paths have no parameters: skip the regex engine for them
+    if "{" not in path:
+        return path
+    
     # Normalize parameter formats: {id} vs ${resourceIds['id']}
     # We'll compare the base path structure
-    normalized = re.sub(r'\{[^}]+\}', '{param}', path)
-    normalized = re.sub(r'\$\{[^}]+\}', '{param}', normalized)
+    normalized = _PARAM_RE.sub('{param}', path)
     
     return normalized
 
@@ -167,53 +239,57 @@ def analyze_coverage(spec_endpoints, tested_endpoints):
         "by_tag": {}
     }
     
-    # Group endpoints by method
-    spec_by_method = {}
-    for ep in spec_endpoints:
-        method = ep["method"]
-        if method not in spec_by_method:
-            spec_by_method[method] = []
-        spec_by_method[method].append(ep)
-    
-    # Check coverage
-    tested_set = set()
-    for method, path in tested_endpoints:
-        normalized = normalize_path(path)
-        tested_set.add((method, normalized))
+    # Check coverage against the normalized calls (normalize_path is memoized)
+    tested_set = {(method, normalize_path(path)) for method, path in tested_endpoints}
     
+    # Only the records are collected in the loop; the report entries are built afterwards
     covered = []
     missing = []
+    # Per-method [total, tested, missing] and per-tag stats, filled in the same pass
+    method_counts = defaultdict(lambda: [0, 0, 0])
+    tags_dict = defaultdict(lambda: {"total": 0, "tested": 0, "missing": 0})
     
     for ep in spec_endpoints:
-        method = ep["method"]
-        path = ep["path"]
-        normalized = normalize_path(path)
+        method = ep.method
+        path = ep.path
+        is_tested = (method, normalize_path(path)) in tested_set
         
-        # Skip problematic endpoints
-        consumes = ep.get("consumes", [])
-        if "multipart/form-data" in consumes or "application/x-www-form-urlencoded" in consumes:
-            continue
+        method_stats = method_counts[method]
+        method_stats[0] += 1
         
-        # Skip bulk endpoints
-        if path in ["/user/createWithList", "/user/createWithArray"]:
+        # Coverage by tag counts every endpoint, including the skipped ones below
+        for tag in ep.tags:
+            tag_stats = tags_dict[tag]
+            tag_stats["total"] += 1
+            if is_tested:
+                tag_stats["tested"] += 1
+            else:
+                tag_stats["missing"] += 1
+        
+        # Skip problematic endpoints (form uploads) and bulk endpoints
+        if not _SKIP_CONSUMES.isdisjoint(ep.consumes) or path in _SKIP_PATHS:
             continue
         
-        if (method, normalized) in tested_set:
+        if is_tested:
+            method_stats[1] += 1
             covered.append(ep)
-            coverage_report["covered_endpoints"].append({
-                "method": method,
-                "path": path,
-                "summary": ep.get("summary", "")
-            })
         else:
+            method_stats[2] += 1
             missing.append(ep)
-            coverage_report["missing_tests"].append({
-                "method": method,
-                "path": path,
-                "summary": ep.get("summary", ""),
-                "description": ep.get("description", ""),
-                "tags": ep.get("tags", [])
-            })
+    
+    coverage_report["covered_endpoints"] = [
+        {"method": ep.method, "path": ep.path, "summary": ep.summary} for ep in covered
+    ]
+    coverage_report["missing_tests"] = [
+        {
+            "method": ep.method,
+            "path": ep.path,
+            "summary": ep.summary,
+            "description": ep.description,
+            "tags": ep.tags
+        }
+        for ep in missing
+    ]
     
     # Calculate coverage percentage
     total_testable = len(covered) + len(missing)
@@ -222,46 +298,30 @@ def analyze_coverage(spec_endpoints, tested_endpoints):
     
     # Coverage by method
     for method in ["GET", "POST", "PUT", "DELETE", "PATCH"]:
-        method_endpoints = [ep for ep in spec_endpoints if ep["method"] == method]
-        method_tested = [ep for ep in covered if ep["method"] == method]
-        method_missing = [ep for ep in missing if ep["method"] == method]
-        
-        if method_endpoints:
-            method_coverage = round((len(method_tested) / len(method_endpoints)) * 100, 2)
+        if method in method_counts:
+            total, tested, method_missing = method_counts[method]
             coverage_report["by_method"][method] = {
-                "total": len(method_endpoints),
-                "tested": len(method_tested),
-                "missing": len(method_missing),
-                "coverage": method_coverage
+                "total": total,
+                "tested": tested,
+                "missing": method_missing,
+                "coverage": round((tested / total) * 100, 2)
             }
     
-    # Coverage by tag
-    tags_dict = {}
-    for ep in spec_endpoints:
-        tags = ep.get("tags", ["untagged"])
-        for tag in tags:
-            if tag not in tags_dict:
-                tags_dict[tag] = {"total": 0, "tested": 0, "missing": 0}
-            tags_dict[tag]["total"] += 1
-            
-            normalized = normalize_path(ep["path"])
-            if (ep["method"], normalized) in tested_set:
-                tags_dict[tag]["tested"] += 1
-            else:
-                tags_dict[tag]["missing"] += 1
-    
     for tag, stats in tags_dict.items():
         if stats["total"] > 0:
             stats["coverage"] = round((stats["tested"] / stats["total"]) * 100, 2)
     
-    coverage_report["by_tag"] = tags_dict
+    coverage_report["by_tag"] = dict(tags_dict)
     
     return coverage_report
 
 
 def generate_coverage_report(coverage_report, output_file="reports/coverage_report.json"):
     """Generate a detailed coverage report"""
-    report_text = f"""
+    # Sections are collected and joined once at the end
+    parts = []
+    append = parts.append
+    append(f"""
 {'='*80}
 📊 TEST COVERAGE ANALYSIS REPORT
 {'='*80}
@@ -274,61 +334,61 @@ Missing Tests: {len(coverage_report['missing_tests'])}
 {'='*80}
 COVERAGE BY HTTP METHOD
 {'='*80}
-"""
+""")
     
     for method, stats in coverage_report["by_method"].items():
-        report_text += f"""
+        append(f"""
 {method}:
   Total: {stats['total']}
   Tested: {stats['tested']} ({stats['coverage']}%)
   Missing: {stats['missing']}
-"""
+""")
     
-    report_text += f"""
+    append(f"""
 {'='*80}
 COVERAGE BY TAG
 {'='*80}
-"""
+""")
     
     for tag, stats in sorted(coverage_report["by_tag"].items()):
         if stats["total"] > 0:
-            report_text += f"""
+            append(f"""
 {tag}:
   Total: {stats['total']}
   Tested: {stats['tested']} ({stats.get('coverage', 0)}%)
   Missing: {stats['missing']}
-"""
+""")
     
     if coverage_report["missing_tests"]:
-        report_text += f"""
+        append(f"""
 {'='*80}
 MISSING TESTS
 {'='*80}
-"""
+""")
         for missing in coverage_report["missing_tests"]:
-            report_text += f"""
+            append(f"""
 ❌ {missing['method']} {missing['path']}
    Summary: {missing.get('summary', 'No summary')}
    Tags: {', '.join(missing.get('tags', []))}
-"""
+""")
     
-    report_text += f"""
+    append(f"""
 {'='*80}
 COVERED ENDPOINTS
 {'='*80}
-"""
+""")
     
     for covered in coverage_report["covered_endpoints"]:
-        report_text += f"""
+        append(f"""
 ✅ {covered['method']} {covered['path']}
    {covered.get('summary', '')}
-"""
+""")
     
-    report_text += f"""
+    append(f"""
 {'='*80}
 RECOMMENDATIONS
 {'='*80}
-"""
+""")
     
     # Generate recommendations
     recommendations = []
@@ -354,9 +414,10 @@ RECOMMENDATIONS
         recommendations.append("✅ Excellent coverage! All critical endpoints are tested.")
     
     for rec in recommendations:
-        report_text += f"{rec}\n"
+        append(f"{rec}\n")
     
-    report_text += f"\n{'='*80}\n"
+    append(f"\n{'='*80}\n")
+    report_text = "".join(parts)
     
     # Create reports directory if it doesn't exist
     if not os.path.isabs(output_file):
@@ -366,42 +427,58 @@ RECOMMENDATIONS
     
     os.makedirs(reports_dir, exist_ok=True)
     
-    # Save text report
+    # Save text and JSON reports; they are independent files, so write them concurrently
     txt_file = reports_dir / "coverage_report.txt"
-    with open(txt_file, "w") as f:
-        f.write(report_text)
-    
-    # Save JSON report
     json_file = reports_dir / "coverage_report.json"
-    with open(json_file, "w") as f:
-        json.dump(coverage_report, f, indent=2)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        writes = [
+            executor.submit(txt_file.write_text, report_text),
+            executor.submit(_write_json_report, json_file, coverage_report),
+        ]
+        for write in writes:
+            # Re-raise any write error here
+            write.result()
     
     return report_text, str(json_file)
 
 
+def _write_json_report(json_file, coverage_report):
+    if orjson is not None:
+        # Serialize in C and hand the whole buffer to a single write
+        json_file.write_bytes(orjson.dumps(coverage_report, option=orjson.OPT_INDENT_2))
+    else:
+        with open(json_file, "w") as f:
+            json.dump(coverage_report, f, indent=2)
+
+
 def main():
     """Main execution"""
     print("=" * 80)
     print("🔍 Agent 2: Test Coverage Reviewer")
     print("=" * 80)
     
-    # Load API specification
-    print(f"\n📡 Loading API specification from: {SWAGGER_URL}")
-    try:
-        spec = load_swagger_spec()
-        print("✅ API specification loaded")
-    except Exception as e:
-        print(f"❌ Error loading API spec: {e}")
-        return
-    
-    # Extract endpoints from spec
-    print("📋 Extracting endpoints from API documentation...")
-    spec_endpoints = extract_endpoints_from_spec(spec)
-    print(f"✅ Found {len(spec_endpoints)} endpoints in API documentation")
-    
-    # Load generated tests
-    print(f"\n📄 Loading generated tests from: {TEST_FILE}")
-    test_content = load_generated_tests()
+    # The spec download and the test file read are independent, so overlap them
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        spec_future = executor.submit(load_swagger_spec)
+        tests_future = executor.submit(load_generated_tests)
+        
+        # Load API specification
+        print(f"\n📡 Loading API specification from: {SWAGGER_URL}")
+        try:
+            spec = spec_future.result()
+            print("✅ API specification loaded")
+        except Exception as e:
+            print(f"❌ Error loading API spec: {e}")
+            return
+        
+        # Extract endpoints from spec
+        print("📋 Extracting endpoints from API documentation...")
+        spec_endpoints = extract_endpoints_from_spec(spec)
+        print(f"✅ Found {len(spec_endpoints)} endpoints in API documentation")
+        
+        # Load generated tests
+        print(f"\n📄 Loading generated tests from: {TEST_FILE}")
+        test_content = tests_future.result()
     if not test_content:
         return
     
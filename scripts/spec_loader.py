@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Optional fast JSON parser for large specs
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from scripts.config_loader import PROJECT_ROOT, write_atomic
+
+
+# Parsed specs are pickled here and revalidated with a conditional GET
+SPEC_CACHE_DIR = PROJECT_ROOT / ".swagger_cache"
+SPEC_TIMEOUT = 30
+
+
+def new_spec_session() -> requests.Session:
+    """HTTP session for spec fetches: keeps connections alive and retries transient failures.
+
+    requests already negotiates gzip/deflate transfer encoding by default. Sessions
+    are not guaranteed to be thread-safe, so each worker thread should create its own.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=(502, 503, 504)))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _parse_spec_body(response) -> Dict[str, Any]:
+    """Parse a buffered spec response (orjson reads the raw bytes, much faster on large specs)."""
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
+
+def _store_spec(response, parse, meta_file: Path, spec_file: Path) -> Dict[str, Any]:
+    """Parse a 200 spec response and cache it with its validators."""
+    response.raise_for_status()
+    spec = parse(response)
+
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if etag or last_modified:
+        try:
+            os.makedirs(spec_file.parent, exist_ok=True)
+            # Spec first: the validators must never point at an older pickle
+            write_atomic(spec_file, pickle.dumps(spec, protocol=pickle.HIGHEST_PROTOCOL))
+            meta = {"etag": etag, "last_modified": last_modified}
+            write_atomic(meta_file, json.dumps(meta).encode("utf-8"))
+        except OSError:
+            # Caching is best-effort
+            pass
+    return spec
+
+
+def load_cached_spec(
+    url: str,
+    session: Any,
+    timeout: float = SPEC_TIMEOUT,
+    parse: Optional[Callable[[Any], Dict[str, Any]]] = None,
+    stream: bool = False,
+    cache_dir: Optional[Path] = None,
+) -> Dict[str, Any]:
+    """Fetch and parse a Swagger/OpenAPI spec, reusing the cached copy while it is unchanged.
+
+    The parsed spec is pickled under .swagger_cache/ with its ETag/Last-Modified and
+    revalidated with a conditional GET, so every script shares one cache. parse turns
+    a 200 response into the spec (default: orjson or response.json()); pass stream=True
+    when it reads the body incrementally.
+    """
+    parse = parse or _parse_spec_body
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+    cache_dir = cache_dir or SPEC_CACHE_DIR
+    meta_file = cache_dir / f"{key}.meta.json"
+    spec_file = cache_dir / f"{key}.pkl"
+
+    # Ask the server whether the spec changed since the cached copy
+    headers = {}
+    if meta_file.exists() and spec_file.exists():
+        try:
+            meta = json.loads(meta_file.read_text())
+        except (OSError, ValueError):
+            meta = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    with session.get(url, headers=headers, stream=stream, timeout=timeout) as response:
+        if response.status_code != 304:
+            return _store_spec(response, parse, meta_file, spec_file)
+    try:
+        with open(spec_file, "rb") as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        pass
+
+    # Cached copy is unusable: fetch the spec unconditionally
+    with session.get(url, stream=stream, timeout=timeout) as response:
+        return _store_spec(response, parse, meta_file, spec_file)
@@ -0,0 +1,52 @@
+// stream_reporter.js
+// Playwright reporter: prints one JSON line per finished test so that
+// debug_test_results.py can analyze failures while later tests are still running
+
+const path = require('path');
+
+// Keep in sync with TEST_EVENT_PREFIX in debug_test_results.py
+const PREFIX = '@@pw-test-end ';
+
+class StreamReporter {
+  onBegin(config) {
+    this.rootDir = config.rootDir;
+  }
+
+  onTestEnd(test, result) {
+    const event = {
+      testId: test.id,
+      spec: {
+        title: test.title,
+        file: path.relative(this.rootDir, test.location.file),
+        line: test.location.line,
+      },
+      result: {
+        status: result.status,
+        duration: result.duration,
+        retry: result.retry,
+      },
+    };
+
+    const error = result.error;
+    if (error) {
+      event.result.error = {
+        message: error.message || error.value || '',
+        stack: error.stack || '',
+      };
+      if (error.location) {
+        event.result.errorLocation = {
+          ...error.location,
+          file: path.relative(this.rootDir, error.location.file),
+        };
+      }
+    }
+
+    process.stdout.write(PREFIX + JSON.stringify(event) + '\n');
+  }
+
+  printsToStdio() {
+    return false;
+  }
+}
+
+module.exports = StreamReporter;